@@ -1,30 +1,162 @@
+import queue
 import sqlite3  # Using SQLite for this example, but can be adapted for other DBs
+import threading
+
+# Applied once to every physical connection when the pool opens it
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,  # 64 MiB
+}
+
+
+class ConnectionPool:
+    """Thread-safe pool of reusable SQLite connections"""
+
+    def __init__(self, db_name, size=5, pragmas=None, timeout=30):
+        self.db_name = db_name
+        self.size = size
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.timeout = timeout
+        # LIFO so the most recently used, warmest connection is reused first
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._stats = {"checkouts": 0, "opened": 0, "waits": 0, "discarded": 0}
+
+    def _open(self):
+        """Open a connection and apply the PRAGMAs"""
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            if not name.isidentifier():
+                raise ValueError(f"Invalid PRAGMA name: {name}")
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def acquire(self):
+        """Return an idle connection, opening one while the pool is not full"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+        if conn is None:
+            with self._lock:
+                can_open = self._opened < self.size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+                with self._lock:
+                    self._stats["opened"] += 1
+            else:
+                with self._lock:
+                    self._stats["waits"] += 1
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        f"No pooled connection became free within {self.timeout}s"
+                    )
+        with self._lock:
+            self._stats["checkouts"] += 1
+        return conn
+
+    def release(self, conn):
+        """Return a connection, rolling back anything left uncommitted"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Unusable connection: close it and free its slot
+            with self._lock:
+                self._opened -= 1
+                self._stats["discarded"] += 1
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    def stats(self):
+        """Return checkout counters and the current pool occupancy"""
+        with self._lock:
+            stats = dict(self._stats, opened_now=self._opened)
+        stats["idle"] = self._idle.qsize()
+        stats["in_use"] = stats["opened_now"] - stats["idle"]
+        return stats
+
+    def close(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name, size=5, pragmas=None):
+    """Return the shared pool for a database and PRAGMA set"""
+    pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+    key = (db_name, size, tuple(sorted(pragmas.items())))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(db_name, size, pragmas)
+        return _pools[key]
 
 
 class DatabaseConnection:
-    def __init__(self, db_name):
+    """
+    Context manager that borrows a pooled connection for one block
+    Commits when the block succeeds, rolls back and re-raises when it fails,
+    and always returns the connection to the pool.
+    """
+
+    def __init__(self, db_name, pool_size=5, pragmas=None):
         self.db_name = db_name
+        self.pool = get_pool(db_name, pool_size, pragmas)
         self.connection = None
         self.cursor = None
 
     def __enter__(self):
-        # Open the database connection
-        self.connection = sqlite3.connect(self.db_name)
+        # Borrow a connection from the pool
+        self.connection = self.pool.acquire()
         self.cursor = self.connection.cursor()
         return self.cursor
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        # Close the cursor and connection
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
-        # Handle any exceptions that might have occurred
-        if exc_type is not None:
-            print(f"An error occurred: {exc_val}")
-        return True
+        try:
+            if self.cursor:
+                self.cursor.close()
+            if exc_type is None:
+                self.connection.commit()
+            else:
+                self.connection.rollback()
+        finally:
+            # Return the connection even if the commit failed
+            self.pool.release(self.connection)
+            self.connection = None
+            self.cursor = None
+        # Let any exception propagate to the caller
+        return False
+
 
 with DatabaseConnection("users.db") as cursor:
     cursor.execute("SELECT * FROM users")
     results = cursor.fetchall()
     print(results)
+
+# A second block reuses the same physical connection
+with DatabaseConnection("users.db") as cursor:
+    cursor.execute("SELECT COUNT(*) FROM users")
+    print(cursor.fetchone())
+print(get_pool("users.db").stats())
@@ -1,10 +1,148 @@
 from datetime import datetime
+import re
+import math
+import time
+import queue
+import atexit
+import random
 import sqlite3
+import threading
 import functools
 
+# Latencies are bucketed on a log scale with ~10% wide buckets
+BUCKET_BASE = 1.1
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalize_query(query):
+    """Collapse whitespace and literals so similar statements share stats"""
+    return LITERALS.sub("?", " ".join(str(query).split()))
+
+
+class QueryStats:
+    """Per-statement call counts, row counts and latency histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._statements = {}
+
+    def record(self, query, seconds, rows):
+        """Add one execution of a statement"""
+        micros = max(seconds * 1e6, 1.0)
+        bucket = int(math.log(micros, BUCKET_BASE))
+        with self._lock:
+            entry = self._statements.setdefault(
+                normalize_query(query),
+                {"calls": 0, "rows": 0, "total_seconds": 0.0, "buckets": {}},
+            )
+            entry["calls"] += 1
+            entry["rows"] += rows or 0
+            entry["total_seconds"] += seconds
+            entry["buckets"][bucket] = entry["buckets"].get(bucket, 0) + 1
+
+    @staticmethod
+    def _percentile(buckets, calls, percentile):
+        """Estimate a latency percentile in milliseconds from bucket counts"""
+        target = max(math.ceil(percentile / 100 * calls), 1)
+        seen = 0
+        for bucket in sorted(buckets):
+            seen += buckets[bucket]
+            if seen >= target:
+                # Middle of the bucket, converted from microseconds
+                return BUCKET_BASE ** (bucket + 0.5) / 1000
+        return None
+
+    def snapshot(self):
+        """Return calls, rows, mean and p50/p95/p99 latency per statement"""
+        with self._lock:
+            statements = {
+                query: dict(entry, buckets=dict(entry["buckets"]))
+                for query, entry in self._statements.items()
+            }
+        summary = {}
+        for query, entry in statements.items():
+            calls = entry["calls"]
+            summary[query] = {
+                "calls": calls,
+                "rows": entry["rows"],
+                "mean_ms": entry["total_seconds"] / calls * 1000,
+            }
+            for percentile in (50, 95, 99):
+                summary[query][f"p{percentile}_ms"] = self._percentile(
+                    entry["buckets"], calls, percentile
+                )
+        return summary
+
+    def reset(self):
+        """Forget every recorded execution"""
+        with self._lock:
+            self._statements.clear()
+
+
+class QueryLogWriter:
+    """Prints query log lines from a background thread"""
+
+    def __init__(self, max_pending=10000):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def emit(self, timestamp, query, seconds, rows):
+        """Queue a log line without blocking, dropping it if the queue is full"""
+        try:
+            self._queue.put_nowait((timestamp, query, seconds, rows))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            timestamp, query, seconds, rows = item
+            # Formatting happens here, off the query's hot path
+            stamp = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            print(
+                f"[{stamp}] Executing SQL query: {query} "
+                f"({seconds * 1000:.2f} ms, {rows} rows)"
+            )
+
+    def close(self):
+        """Flush pending log lines and stop the writer"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+
+query_stats = QueryStats()
+log_writer = QueryLogWriter()
+
+
+def dump_query_stats():
+    """Print and return the aggregated per-statement statistics"""
+    summary = query_stats.snapshot()
+    for query, stats in summary.items():
+        print(
+            f"{query}: {stats['calls']} calls, {stats['rows']} rows, "
+            f"p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms, "
+            f"p99 {stats['p99_ms']:.2f} ms"
+        )
+    return summary
+
 
 #### decorator to log SQL queries
-def log_queries(func):
+def log_queries(func=None, *, sample_rate=1.0):
+    """
+    Decorator that times queries and logs a sample of them
+    Every call is timed into query_stats; only a sample_rate fraction of
+    calls is written to the log, by a background thread.
+    Usable as @log_queries or @log_queries(sample_rate=0.1).
+    """
+    if func is None:
+        return functools.partial(log_queries, sample_rate=sample_rate)
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         # Extract the query from either args or kwargs
@@ -12,12 +150,22 @@ def log_queries(func):
         if query is None and len(args) > 0:
             query = args[0]
 
-        # Log the query with timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] Executing SQL query: {query}")
+        # Call the original function and time it
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
 
-        # Call the original function
-        return func(*args, **kwargs)
+        # fetchall/fetchmany return a list of rows; fetchone returns one tuple
+        if isinstance(result, list):
+            rows = len(result)
+        elif isinstance(result, tuple):
+            rows = 1
+        else:
+            rows = None
+        query_stats.record(query, seconds, rows)
+        if sample_rate >= 1.0 or random.random() < sample_rate:
+            log_writer.emit(time.time(), query, seconds, rows)
+        return result
 
     return wrapper
 
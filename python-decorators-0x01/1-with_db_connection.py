@@ -1,5 +1,15 @@
 import sqlite3
 import functools
+import threading
+import time
+
+# Applied once to every pooled connection when it is opened
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,  # 64 MiB
+    "mmap_size": 268435456,  # 256 MiB
+}
 
 
 def with_db_connection(func):
@@ -20,6 +30,145 @@ def with_db_connection(func):
     return wrapper
 
 
+class ThreadConnectionPool:
+    """
+    Keeps one open SQLite connection per thread and reuses it across calls
+    Nested calls on a thread share its connection; only the outermost
+    release ends the checkout.
+    """
+
+    def __init__(self, db_name, pragmas=None, max_idle=300, check_after=30):
+        self.db_name = db_name
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}
+        # Ids of connections currently checked out by their thread
+        self._in_use = set()
+        self._last_sweep = time.monotonic()
+
+    def _open(self):
+        """Open a connection and apply the PRAGMAs"""
+        # Each connection is only used by its own thread; sharing is allowed
+        # so that close_idle() can close connections of other threads
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            if not name.isidentifier():
+                raise ValueError(f"Invalid PRAGMA name: {name}")
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _discard(self, conn):
+        """Close a connection and stop tracking it"""
+        with self._lock:
+            self._connections.pop(id(conn), None)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def acquire(self):
+        """Return this thread's connection, opening or replacing it as needed"""
+        conn = getattr(self._local, "conn", None)
+        depth = getattr(self._local, "depth", 0)
+        if depth:
+            # Nested call: keep using the connection the outer call holds
+            self._local.depth = depth + 1
+            return conn
+        with self._lock:
+            now = time.monotonic()
+            sweep = now - self._last_sweep > self.check_after
+            if sweep:
+                self._last_sweep = now
+        if sweep:
+            # Connections left behind by threads that have exited are only
+            # reachable from here
+            self.close_idle()
+        if conn is not None:
+            idle = time.monotonic() - self._connections.get(id(conn), (None, 0))[1]
+            if idle > self.max_idle:
+                self._discard(conn)
+                conn = None
+            elif idle > self.check_after:
+                # Health check connections that have not been used for a while
+                try:
+                    conn.execute("SELECT 1")
+                except sqlite3.Error:
+                    self._discard(conn)
+                    conn = None
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        with self._lock:
+            self._connections[id(conn)] = (conn, time.monotonic())
+            self._in_use.add(id(conn))
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        """
+        End a checkout; the outermost release marks the connection idle and
+        drops anything the calls left uncommitted
+        """
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._in_use.discard(id(conn))
+            if id(conn) in self._connections:
+                self._connections[id(conn)] = (conn, time.monotonic())
+
+    def close_idle(self):
+        """Close connections idle for longer than max_idle, e.g. of dead threads"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                conn
+                for conn, last_used in self._connections.values()
+                if now - last_used > self.max_idle and id(conn) not in self._in_use
+            ]
+        for conn in idle:
+            self._discard(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name="users.db", pragmas=None, max_idle=300):
+    """Return the shared pool for a database and PRAGMA set"""
+    pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+    key = (db_name, tuple(sorted(pragmas.items())), max_idle)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ThreadConnectionPool(db_name, pragmas, max_idle)
+        return _pools[key]
+
+
+def with_pooled_connection(db_name="users.db", pragmas=None, max_idle=300):
+    """Decorator that passes a reused per-thread connection from a shared pool"""
+
+    def decorator(func):
+        pool = get_pool(db_name, pragmas, max_idle)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            conn = pool.acquire()
+            try:
+                return func(conn, *args, **kwargs)
+            finally:
+                pool.release(conn)
+
+        wrapper.pool = pool
+        return wrapper
+
+    return decorator
+
+
 @with_db_connection
 def get_user_by_id(conn, user_id):
     cursor = conn.cursor()
@@ -27,6 +176,17 @@ def get_user_by_id(conn, user_id):
     return cursor.fetchone()
 
 
+@with_pooled_connection("users.db")
+def get_user_by_id_pooled(conn, user_id):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    return cursor.fetchone()
+
+
 # Fetch user by ID with automatic connection handling
 user = get_user_by_id(user_id=1)
 print(user)
+
+# Repeated calls on this thread reuse one open connection
+user = get_user_by_id_pooled(user_id=1)
+print(user)
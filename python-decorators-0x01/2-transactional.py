@@ -1,12 +1,31 @@
+import sys
+import time
 import sqlite3
 import functools
+import threading
+
+# Per-thread transaction nesting depth by connection id, and the active batch
+_local = threading.local()
+
+
+def _depths():
+    depths = getattr(_local, "depths", None)
+    if depths is None:
+        depths = _local.depths = {}
+    return depths
 
 
 def with_db_connection(func):
-    """Decorator that automatically handles database connections"""
+    """
+    Decorator that automatically handles database connections
+    Inside a CommitBatch block the batch's connection is passed instead.
+    """
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        batch = getattr(_local, "batch", None)
+        if batch is not None:
+            return func(batch.conn, *args, **kwargs)
         conn = sqlite3.connect("users.db")
         try:
             result = func(conn, *args, **kwargs)
@@ -18,21 +37,98 @@ def with_db_connection(func):
 
 
 def transactional(func):
-    """Decorator that manages database transactions"""
+    """
+    Decorator that manages database transactions
+    The outermost call commits or rolls back. Calls nested inside another
+    transaction on the same connection, including every call inside a
+    CommitBatch, run in a SAVEPOINT so a failure only undoes their own work.
+    """
 
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
+        depths = _depths()
+        depth = depths.get(id(conn), 0)
+        if depth == 0:
+            depths[id(conn)] = 1
+            try:
+                if not conn.in_transaction:
+                    conn.execute("BEGIN")
+                result = func(conn, *args, **kwargs)
+                conn.commit()
+                return result
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                del depths[id(conn)]
+
+        savepoint = f"sp_{depth}"
+        depths[id(conn)] = depth + 1
+        conn.execute(f"SAVEPOINT {savepoint}")
         try:
             result = func(conn, *args, **kwargs)
-            conn.commit()
-            return result
         except Exception as e:
-            conn.rollback()
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
             raise e
+        finally:
+            depths[id(conn)] = depth
+        conn.execute(f"RELEASE {savepoint}")
+
+        batch = getattr(_local, "batch", None)
+        if depth == 1 and batch is not None and batch.conn is conn:
+            batch.call_done()
+        return result
 
     return wrapper
 
 
+class CommitBatch:
+    """
+    Context manager that groups decorated calls into few commits
+    Every with_db_connection call in the block on this thread shares one
+    connection and transaction, committed on exit (or every commit_every
+    calls) and rolled back if the block raises.
+    """
+
+    def __init__(self, db_name="users.db", commit_every=None):
+        self.db_name = db_name
+        self.commit_every = commit_every
+        self.conn = None
+        self.calls = 0
+        self.commits = 0
+
+    def __enter__(self):
+        if getattr(_local, "batch", None) is not None:
+            raise RuntimeError("CommitBatch blocks cannot be nested")
+        self.conn = sqlite3.connect(self.db_name)
+        self.conn.execute("BEGIN")
+        _depths()[id(self.conn)] = 1
+        _local.batch = self
+        return self
+
+    def call_done(self):
+        """Count a finished call and commit when commit_every is reached"""
+        self.calls += 1
+        if self.commit_every and self.calls % self.commit_every == 0:
+            self.conn.commit()
+            self.commits += 1
+            self.conn.execute("BEGIN")
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self.conn.commit()
+                self.commits += 1
+            else:
+                self.conn.rollback()
+        finally:
+            _local.batch = None
+            del _depths()[id(self.conn)]
+            self.conn.close()
+        return False
+
+
 @with_db_connection
 @transactional
 def update_user_email(conn, user_id, new_email):
@@ -40,5 +136,36 @@ def update_user_email(conn, user_id, new_email):
     cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
 
 
+def benchmark(count=2000, commit_every=None):
+    """
+    Compare update throughput with a commit per call and with CommitBatch
+    Every user's current email is written back, so users.db is unchanged.
+    Returns:
+        dict: Updates per second for each mode
+    """
+    conn = sqlite3.connect("users.db")
+    users = conn.execute("SELECT id, email FROM users").fetchall()
+    conn.close()
+    updates = [users[i % len(users)] for i in range(count)]
+
+    start = time.perf_counter()
+    for user_id, email in updates:
+        update_user_email(user_id=user_id, new_email=email)
+    per_call = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with CommitBatch(commit_every=commit_every):
+        for user_id, email in updates:
+            update_user_email(user_id=user_id, new_email=email)
+    batched = count / (time.perf_counter() - start)
+
+    print(f"commit per call: {per_call:,.0f} updates/s")
+    print(f"CommitBatch:     {batched:,.0f} updates/s ({batched / per_call:.1f}x)")
+    return {"per_call": per_call, "batched": batched}
+
+
 # Update user's email with automatic transaction handling
 update_user_email(user_id=1, new_email="Crawford_Cartwright@hotmail.com")
+
+if __name__ == "__main__" and "--benchmark" in sys.argv[1:]:
+    benchmark()
@@ -1,6 +1,21 @@
 import time
+import random
+import asyncio
+import inspect
 import sqlite3
 import functools
+import threading
+
+# OperationalError messages caused by contention, which a retry can fix
+RETRYABLE_MESSAGES = ("database is locked", "database table is locked", "busy")
+
+retry_stats = {"calls": 0, "retries": 0, "give_ups": 0, "rejected": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        retry_stats[name] += 1
 
 
 def with_db_connection(func):
@@ -18,22 +33,133 @@ def with_db_connection(func):
     return wrapper
 
 
-def retry_on_failure(retries=3, delay=2):
-    """Decorator that retries database operations on failure"""
+def is_retryable(error):
+    """Tell transient lock contention apart from errors a retry cannot fix"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and any(
+        text in message for text in RETRYABLE_MESSAGES
+    )
+
+
+class RetryBudget:
+    """
+    Process-wide limit on retries, with a circuit breaker
+    Every call earns ratio retry tokens (up to max_tokens) and every retry
+    spends one, so retries stay a bounded fraction of the traffic. After
+    failure_threshold consecutive give-ups the circuit opens and calls fail
+    fast for reset_after seconds before one trial call is let through.
+    """
+
+    def __init__(self, ratio=0.2, max_tokens=20, failure_threshold=5, reset_after=10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._tokens = max_tokens
+        self._failures = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow_call(self):
+        """Return False while the circuit is open; otherwise earn tokens"""
+        with self._lock:
+            now = time.monotonic()
+            if self._failures >= self.failure_threshold:
+                if now < self._open_until:
+                    return False
+                # Half-open: let this call through as the trial
+                self._open_until = now + self.reset_after
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+            return True
+
+    def spend(self):
+        """Take one retry token, returning False when the budget is exhausted"""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+
+    def record_give_up(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._open_until = time.monotonic() + self.reset_after
+
+
+default_budget = RetryBudget()
+
+
+def retry_on_failure(
+    retries=3, delay=2, max_delay=30, budget=None, retryable=is_retryable
+):
+    """
+    Decorator that retries database operations on transient failures
+    Waits a random time between 0 and min(max_delay, delay * 2 ** n) before
+    retry n+1 (exponential backoff with full jitter), so contending callers
+    spread out instead of retrying in lockstep. Only errors accepted by
+    retryable are retried, within the shared retry budget. Works on both
+    plain and async functions.
+    """
+    budget = default_budget if budget is None else budget
+
+    def backoff(attempt):
+        return random.uniform(0, min(max_delay, delay * 2 ** (attempt - 1)))
+
+    def should_retry(error, attempt):
+        # Bugs such as syntax errors are raised at once and do not trip the
+        # circuit, which only tracks contention that outlasted its retries
+        if not retryable(error):
+            return False
+        if attempt >= retries or not budget.spend():
+            _count("give_ups")
+            budget.record_give_up()
+            return False
+        _count("retries")
+        return True
+
+    def reject():
+        _count("rejected")
+        raise sqlite3.OperationalError("Retry circuit is open, failing fast")
 
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                _count("calls")
+                if not budget.allow_call():
+                    reject()
+                for attempt in range(1, retries + 1):
+                    try:
+                        result = await func(*args, **kwargs)
+                        budget.record_success()
+                        return result
+                    except (sqlite3.OperationalError, sqlite3.DatabaseError) as e:
+                        if not should_retry(e, attempt):
+                            raise
+                        await asyncio.sleep(backoff(attempt))
+
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            last_exception = None
+            _count("calls")
+            if not budget.allow_call():
+                reject()
             for attempt in range(1, retries + 1):
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
+                    budget.record_success()
+                    return result
                 except (sqlite3.OperationalError, sqlite3.DatabaseError) as e:
-                    last_exception = e
-                    if attempt < retries:
-                        time.sleep(delay)
-                        continue
-                    raise last_exception
+                    if not should_retry(e, attempt):
+                        raise
+                    time.sleep(backoff(attempt))
 
         return wrapper
 
@@ -1,24 +1,433 @@
+import os
+import re
+import sys
 import time
+import mmap
+import uuid
+import pickle
+import struct
 import sqlite3
+import hashlib
+import tempfile
 import functools
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import Future
 
-query_cache = {}
+# Quoted string literals and identifiers, which keys keep byte for byte
+QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+# Sources a statement reads from: the whole FROM list, so comma joins such
+# as FROM users u, orders o are covered, and every JOIN target
+READ_SOURCES = re.compile(
+    r"\bFROM\s+((?:[`\"\[]?\w+[`\"\]]?(?:\s+(?:AS\s+)?\w+)?\s*,\s*)*[`\"\[]?\w+)"
+    r"|\bJOIN\s+[`\"\[]?(\w+)",
+    re.IGNORECASE,
+)
+TABLE_NAME = re.compile(r"[`\"\[]?(\w+)")
+# The table a write statement changes
+WRITE_TABLE = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?"
+    r"|DELETE\s+FROM)\s+[`\"\[]?(\w+)",
+    re.IGNORECASE,
+)
+
+
+def normalize_query(query):
+    """Collapse whitespace outside quoted literals, leaving literals exact"""
+    parts = QUOTED.split(query.strip())
+    return "".join(
+        part if index % 2 else re.sub(r"\s+", " ", part)
+        for index, part in enumerate(parts)
+    )
+
+
+def read_tables(query):
+    """Return the lower-cased names of every table a statement reads"""
+    tables = set()
+    # Blank out string literals so words inside them are not taken as tables
+    query = re.sub(r"'(?:[^']|'')*'", "''", query)
+    for from_list, joined in READ_SOURCES.findall(query):
+        if joined:
+            tables.add(joined.lower())
+        for item in filter(None, (item.strip() for item in from_list.split(","))):
+            tables.add(TABLE_NAME.match(item).group(1).lower())
+    return frozenset(tables)
+
+
+def _result_size(result):
+    """Estimate the memory held by a query result in bytes"""
+    size = sys.getsizeof(result)
+    if isinstance(result, (list, tuple)):
+        for row in result:
+            size += sys.getsizeof(row)
+            if isinstance(row, (list, tuple)):
+                size += sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+def _freeze(value):
+    """Turn bound parameters into something hashable for the cache key"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of query results
+    Entries expire after ttl seconds, the least recently used ones are
+    evicted past max_entries or max_bytes, and invalidate_tables() drops
+    every entry that read from a table that has been written to. All
+    methods are thread-safe, and get_or_load() lets concurrent misses on
+    the same key share one execution.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        # Futures of the loads in progress, and a counter bumped on every
+        # invalidation so a load that overlapped one is not cached
+        self._loading = {}
+        self._generation = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    @staticmethod
+    def make_key(query, args=(), kwargs=None):
+        """Build a cache key from the query text and its bound parameters"""
+        return (
+            normalize_query(query),
+            _freeze(args),
+            _freeze(kwargs or {}),
+        )
+
+    def get(self, key):
+        """
+        Look up a cached result
+        Returns:
+            tuple: (True, result) on a hit, (False, None) on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] < time.monotonic():
+                self._remove(key)
+                self.stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return True, entry[0]
+
+    def get_or_load(self, key, load):
+        """
+        Return the cached result for key, calling load() once on a miss
+        Callers that miss while another thread is loading the same key wait
+        for that load instead of running their own.
+        Returns:
+            tuple: (True, result) if the result came from the cache or a
+            concurrent load, (False, result) if this call ran load()
+        """
+        with self._lock:
+            found, result = self.get(key)
+            if found:
+                return True, result
+            future = self._loading.get(key)
+            leader = future is None
+            if leader:
+                future = self._loading[key] = Future()
+                generation = self._generation
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return True, future.result()
+
+        try:
+            result = load()
+            with self._lock:
+                # Store before releasing the key so no new caller misses in between
+                if generation == self._generation:
+                    self.set(key, result)
+                del self._loading[key]
+        except BaseException as e:
+            # Always release the key and wake the waiters, even when the load
+            # is interrupted by KeyboardInterrupt or SystemExit
+            with self._lock:
+                self._loading.pop(key, None)
+            if not isinstance(e, Exception):
+                e = RuntimeError(f"Query load was interrupted: {e!r}")
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return False, result
+
+    def set(self, key, result):
+        """Store a result, evicting least recently used entries to make room"""
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return
+        tables = read_tables(key[0])
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (result, size, time.monotonic() + self.ttl, tables)
+            self._bytes += size
+            while (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def invalidate_tables(self, tables):
+        """Drop every entry that reads from one of the given tables"""
+        tables = {table.lower() for table in tables}
+        with self._lock:
+            self._generation += 1
+            stale = [key for key, entry in self._entries.items() if entry[3] & tables]
+            for key in stale:
+                self._remove(key)
+            self.stats["invalidations"] += len(stale)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        """Remove one entry and release its size; call with the lock held"""
+        self._bytes -= self._entries.pop(key)[1]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MappedRows(Sequence):
+    """
+    Read-only list of rows backed by a memory-mapped cache file
+    A row is only unpickled when it is accessed.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self._count = struct.unpack_from("<Q", buffer, len(DiskCache.MAGIC))[0]
+        self._offsets = len(DiskCache.MAGIC) + 8
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("row index out of range")
+        start, end = struct.unpack_from("<QQ", self._buffer, self._offsets + 8 * index)
+        return pickle.loads(memoryview(self._buffer)[start:end])
+
+    def __eq__(self, other):
+        if isinstance(other, (list, MappedRows)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"<MappedRows of {self._count} rows>"
+
+
+class DiskCache:
+    """
+    Persistent tier of query results shared by every process on the host
+    Each result is a file of individually pickled rows behind an offset
+    table, written under a temporary name and moved into place with
+    os.replace() so readers never see a partial file. Keys include the
+    database file, its schema version and a generation token per table read.
+    Commits through transactional in any process replace the tokens, which
+    makes older entries unreachable and deletes their files; writes made any
+    other way are only seen once ttl has passed. Expired files are purged
+    every purge_every writes. Results are unpickled on load, so only use a
+    directory that no other user can write to.
+    """
+
+    MAGIC = b"QRC1"
+    # File name prefix for results whose table list is too long to spell out
+    MANY_TABLES = "_many"
+
+    def __init__(self, directory=".query_cache", ttl=3600, purge_every=100):
+        self.directory = directory
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "deleted": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def _generation(self, table):
+        """Return the current generation token of a table"""
+        try:
+            with open(os.path.join(self.directory, f"{table}.gen")) as f:
+                return f.read()
+        except FileNotFoundError:
+            return ""
+
+    def _write_atomic(self, name, data):
+        """Write a file in the cache directory and move it into place"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, os.path.join(self.directory, name))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def path_for(self, conn, key):
+        """Return the file path holding the result for a key on this database"""
+        database = conn.execute("PRAGMA database_list").fetchone()[2]
+        schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        tables = sorted(read_tables(key[0]))
+        generations = [self._generation(table) for table in tables]
+        digest = hashlib.sha256(
+            repr((key, database, schema_version, generations)).encode()
+        ).hexdigest()
+        # The tables read are spelled out in the name so that
+        # invalidate_tables() can find and delete the superseded files
+        prefix = "+".join(tables)
+        if len(prefix) > 120:
+            prefix = self.MANY_TABLES
+        return os.path.join(self.directory, f"{prefix}~{digest}.rows")
+
+    def get(self, path):
+        """Map a cached result, returning None when it is missing or expired"""
+        try:
+            with open(path, "rb") as f:
+                if time.time() - os.fstat(f.fileno()).st_mtime > self.ttl:
+                    os.unlink(path)
+                    buffer = None
+                else:
+                    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            buffer = None
+        if buffer is None or buffer[: len(self.MAGIC)] != self.MAGIC:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return MappedRows(buffer)
+
+    def set(self, path, rows):
+        """Store a list of rows at path"""
+        blobs = [pickle.dumps(row, pickle.HIGHEST_PROTOCOL) for row in rows]
+        offset = len(self.MAGIC) + 8 + 8 * (len(blobs) + 1)
+        offsets = [offset]
+        for blob in blobs:
+            offset += len(blob)
+            offsets.append(offset)
+        header = self.MAGIC + struct.pack(f"<Q{len(offsets)}Q", len(blobs), *offsets)
+        self._write_atomic(os.path.basename(path), header + b"".join(blobs))
+        self.stats["writes"] += 1
+        if self.purge_every and self.stats["writes"] % self.purge_every == 0:
+            self.purge()
+
+    def invalidate_tables(self, tables):
+        """Give tables a new generation and delete every result that read them"""
+        tables = {table.lower() for table in tables}
+        if not tables:
+            return
+        for table in tables:
+            self._write_atomic(f"{table}.gen", uuid.uuid4().hex.encode())
+        self._delete_where(
+            lambda read, entry: read == {self.MANY_TABLES} or bool(read & tables)
+        )
+
+    def purge(self):
+        """Delete expired result files"""
+        expired_before = time.time() - self.ttl
+        self._delete_where(
+            lambda read, entry: entry.stat().st_mtime < expired_before
+        )
+
+    def _delete_where(self, condition):
+        """Delete the result files for which condition(tables, entry) holds"""
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".rows"):
+                continue
+            read = set(entry.name.split("~", 1)[0].split("+"))
+            try:
+                if condition(read, entry):
+                    os.unlink(entry.path)
+                    self.stats["deleted"] += 1
+            except FileNotFoundError:
+                pass
+
+
+query_cache = QueryCache()
+# Optional persistent tier behind query_cache, see enable_disk_cache()
+disk_cache = None
+
+
+def enable_disk_cache(directory=".query_cache", ttl=3600):
+    """
+    Persist cached results to directory, shared with other processes
+    From then on every lookup, including in-memory hits, checks the schema
+    version and table generation tokens, so a transactional write in any
+    process is seen by the next call in every other process.
+    """
+    global disk_cache
+    disk_cache = DiskCache(directory, ttl)
+    # Drop whatever earlier runs left behind past its ttl
+    disk_cache.purge()
+    return disk_cache
 
 
 def cache_query(func):
-    """Decorator that caches database query results based on the query string"""
+    """
+    Decorator that caches database query results by query and parameters
+    Concurrent callers missing on the same query share one execution, and
+    when the disk tier is enabled misses are looked up there first.
+    """
 
     @functools.wraps(func)
     def wrapper(conn, query, *args, **kwargs):
-        # Check if query is already in cache
-        if query in query_cache:
-            print("Returning cached result")
-            return query_cache[query]
-
-        # Execute query and store result in cache
-        result = func(conn, query, *args, **kwargs)
-        query_cache[query] = result
-        print("Caching new result")
+        # Return the cached result, or execute the query once for every
+        # concurrent caller and store the result in the cache
+        key = query_cache.make_key(query, args, kwargs)
+        path = None
+        if disk_cache is not None:
+            # The path covers the schema version and the generation tokens of
+            # the tables read, so putting it in the in-memory key makes writes
+            # from other processes invalidate this process's copy as well
+            path = disk_cache.path_for(conn, key)
+            key += (path,)
+
+        def load():
+            if path is None:
+                return func(conn, query, *args, **kwargs)
+            rows = disk_cache.get(path)
+            if rows is None:
+                rows = func(conn, query, *args, **kwargs)
+                # Only fetchall()-style lists of rows; a lone fetchone() row
+                # is a tuple and would come back as one "row" per column
+                if isinstance(rows, list):
+                    disk_cache.set(path, rows)
+            return rows
+
+        cached, result = query_cache.get_or_load(key, load)
+        print("Returning cached result" if cached else "Caching new result")
         return result
 
     return wrapper
@@ -39,6 +448,32 @@ def with_db_connection(func):
     return wrapper
 
 
+def transactional(func):
+    """Decorator that manages transactions and invalidates cached reads on commit"""
+
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        # Record the tables written during the call from the executed SQL
+        written = set()
+        conn.set_trace_callback(
+            lambda statement: written.update(WRITE_TABLE.findall(statement))
+        )
+        try:
+            result = func(conn, *args, **kwargs)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.set_trace_callback(None)
+        query_cache.invalidate_tables(written)
+        if disk_cache is not None:
+            disk_cache.invalidate_tables(written)
+        return result
+
+    return wrapper
+
+
 @with_db_connection
 @cache_query
 def fetch_users_with_cache(conn, query):
@@ -47,6 +482,13 @@ def fetch_users_with_cache(conn, query):
     return cursor.fetchall()
 
 
+@with_db_connection
+@transactional
+def update_user_email(conn, user_id, new_email):
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+
 # First call will cache the result
 users = fetch_users_with_cache(query="SELECT * FROM users")
 
@@ -0,0 +1,201 @@
+import time
+import queue
+import sqlite3
+import functools
+import threading
+from concurrent.futures import Future
+
+_local = threading.local()
+# Open connections shared by every batch, whichever thread runs it
+_idle_connections = queue.LifoQueue()
+
+
+def with_pooled_connection(func):
+    """
+    Decorator that passes a long-lived connection from a shared pool
+    Connections stay open between calls, so statements parsed by one batch
+    are reused from sqlite3's per-connection statement cache by the next.
+    The pool grows to the number of batches that ever ran at once.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            conn = _idle_connections.get_nowait()
+        except queue.Empty:
+            # Batches run on whichever caller thread flushes them
+            conn = sqlite3.connect("users.db", check_same_thread=False)
+        try:
+            return func(conn, *args, **kwargs)
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            _idle_connections.put(conn)
+
+    return wrapper
+
+
+class Batcher:
+    """
+    Collects calls to a function and runs them together
+    The wrapped function takes a list of items and returns one result per
+    item, in order. Each caller gets back only its own result.
+    """
+
+    def __init__(self, func, window=None, max_size=500):
+        self.func = func
+        self.window = window
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._pending = []
+        self.stats = {"calls": 0, "batches": 0}
+
+    def run(self, batch):
+        """Execute one batch of (item, future) pairs and resolve the futures"""
+        if not batch:
+            return
+        with self._lock:
+            self.stats["batches"] += 1
+        items = [item for item, _ in batch]
+        try:
+            results = self.func(items)
+            if len(results) != len(items):
+                raise ValueError(
+                    f"{self.func.__name__} returned {len(results)} results "
+                    f"for {len(items)} items"
+                )
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def submit(self, item):
+        """Queue one call and return a Future for its result"""
+        future = Future()
+        with self._lock:
+            self.stats["calls"] += 1
+        scope = getattr(_local, "scope", None)
+        if scope is not None:
+            # Explicit scope: flushed when full or when the scope ends
+            pending = scope.setdefault(self, [])
+            pending.append((item, future))
+            if len(pending) >= self.max_size:
+                self.run(scope.pop(self))
+            return future
+
+        with self._lock:
+            pending = self._pending
+            pending.append((item, future))
+            full = len(pending) >= self.max_size
+            leader = len(pending) == 1
+            if full:
+                self._pending = []
+        if full:
+            self.run(pending)
+        elif leader:
+            # The first caller waits out the window, then runs everything
+            # that arrived meanwhile unless a full batch already flushed it
+            if self.window:
+                time.sleep(self.window)
+            with self._lock:
+                if self._pending is not pending:
+                    return future
+                self._pending = []
+            self.run(pending)
+        return future
+
+
+class BatchScope:
+    """
+    Context manager that defers batched calls made on this thread
+    Calls inside the block return Futures; they are executed together, one
+    query per batched function, when the block ends.
+    """
+
+    def __enter__(self):
+        if getattr(_local, "scope", None) is not None:
+            raise RuntimeError("BatchScope blocks cannot be nested")
+        _local.scope = {}
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        scope, _local.scope = _local.scope, None
+        for batcher, pending in scope.items():
+            if exc_type is None:
+                batcher.run(pending)
+            else:
+                for _, future in pending:
+                    future.cancel()
+        return False
+
+
+def batched(window=0.002, max_size=500):
+    """
+    Decorator that merges single-item calls into one call on a list of items
+    Concurrent calls arriving within window seconds of each other (up to
+    max_size) run as one batch and block until their own result is ready.
+    Inside a BatchScope calls return Futures instead.
+    """
+
+    def decorator(func):
+        batcher = Batcher(func, window, max_size)
+
+        @functools.wraps(func)
+        def wrapper(item):
+            future = batcher.submit(item)
+            if getattr(_local, "scope", None) is not None:
+                return future
+            return future.result()
+
+        wrapper.batcher = batcher
+        return wrapper
+
+    return decorator
+
+
+@functools.lru_cache(maxsize=32)
+def in_list_query(sql, size):
+    """
+    Expand the {} in sql to an IN list of size placeholders
+    Sizes are rounded up to a power of two so only a handful of distinct
+    statements exist; on the long-lived connections of
+    with_pooled_connection each is parsed once and then reused from
+    sqlite3's per-connection statement cache.
+    """
+    size = 1 << max(size - 1, 0).bit_length()
+    return sql.format(", ".join("?" * size)), size
+
+
+@batched()
+@with_pooled_connection
+def get_user_by_id(conn, user_ids):
+    sql, size = in_list_query("SELECT * FROM users WHERE id IN ({})", len(user_ids))
+    # Pad with the last id so the statement text depends only on the size
+    params = list(user_ids) + [user_ids[-1]] * (size - len(user_ids))
+    rows = {row[0]: row for row in conn.execute(sql, params)}
+    return [rows.get(user_id) for user_id in user_ids]
+
+
+@batched()
+@with_pooled_connection
+def update_user_email(conn, updates):
+    """Each item is a (user_id, new_email) pair; all run in one executemany"""
+    try:
+        conn.executemany(
+            "UPDATE users SET email = ? WHERE id = ?",
+            [(new_email, user_id) for user_id, new_email in updates],
+        )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise e
+    return [None] * len(updates)
+
+
+# Three lookups by id become a single IN (...) query
+with BatchScope():
+    futures = [get_user_by_id(user_id) for user_id in (1, 2, 3)]
+print([future.result() for future in futures])
+print(get_user_by_id.batcher.stats)
@@ -0,0 +1,413 @@
+import re
+import time
+import random
+import asyncio
+import sqlite3
+import functools
+import contextlib
+import contextvars
+from collections import OrderedDict
+
+import aiosqlite
+
+# Applied once to every pooled connection when it is opened
+DEFAULT_PRAGMAS = {"journal_mode": "WAL", "synchronous": "NORMAL"}
+RETRYABLE_MESSAGES = ("database is locked", "database table is locked", "busy")
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+# Quoted string literals and identifiers, which keys keep byte for byte
+QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+# Sources a statement reads from: the whole FROM list, so comma joins such
+# as FROM users u, orders o are covered, and every JOIN target
+READ_SOURCES = re.compile(
+    r"\bFROM\s+((?:[`\"\[]?\w+[`\"\]]?(?:\s+(?:AS\s+)?\w+)?\s*,\s*)*[`\"\[]?\w+)"
+    r"|\bJOIN\s+[`\"\[]?(\w+)",
+    re.IGNORECASE,
+)
+TABLE_NAME = re.compile(r"[`\"\[]?(\w+)")
+# The table a write statement changes
+WRITE_TABLE = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?"
+    r"|DELETE\s+FROM)\s+[`\"\[]?(\w+)",
+    re.IGNORECASE,
+)
+
+# The connection and transaction of the current task. They let the
+# decorators find each other's state whatever order they are stacked in.
+_connection = contextvars.ContextVar("connection", default=None)
+_in_transaction = contextvars.ContextVar("in_transaction", default=False)
+
+
+class AsyncConnectionPool:
+    """Fixed-size pool of aiosqlite connections shared by every decorator"""
+
+    def __init__(self, db_name, size=5, pragmas=None):
+        self.db_name = db_name
+        self.size = size
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self._idle = asyncio.Queue()
+        self._opened = 0
+        self._connections = set()
+        self.closed = False
+
+    async def _open(self):
+        """Open a connection and apply the PRAGMAs"""
+        conn = await aiosqlite.connect(self.db_name)
+        self._connections.add(conn)
+        for name, value in self.pragmas.items():
+            if not name.isidentifier():
+                raise ValueError(f"Invalid PRAGMA name: {name}")
+            await conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    async def acquire(self):
+        """Return an idle connection, opening one while under size"""
+        if self._idle.empty() and self._opened < self.size:
+            self._opened += 1
+            try:
+                return await self._open()
+            except Exception:
+                self._opened -= 1
+                raise
+        return await self._idle.get()
+
+    async def release(self, conn):
+        """Return a connection, dropping anything left uncommitted"""
+        if self.closed:
+            # Checked out when the pool was closed: close it on return
+            await self._discard(conn)
+            return
+        if conn.in_transaction:
+            await conn.rollback()
+        self._idle.put_nowait(conn)
+
+    async def _discard(self, conn):
+        """Close a connection and stop tracking it"""
+        if conn in self._connections:
+            self._connections.discard(conn)
+            self._opened -= 1
+            await conn.close()
+
+    async def close(self):
+        """Close every connection, including ones still checked out"""
+        self.closed = True
+        for conn in list(self._connections):
+            await self._discard(conn)
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
+
+_pools = {}
+
+
+def get_pool(db_name="users.db", size=5):
+    """Return the shared pool for a database on the running event loop"""
+    key = (db_name, id(asyncio.get_running_loop()))
+    if key not in _pools:
+        _pools[key] = AsyncConnectionPool(db_name, size)
+    return _pools[key]
+
+
+async def close_pool(db_name="users.db"):
+    """
+    Close the running loop's pool for a database and forget it, so a later
+    loop that happens to reuse the loop's id gets a fresh pool
+    """
+    pool = _pools.pop((db_name, id(asyncio.get_running_loop())), None)
+    if pool is not None:
+        await pool.close()
+
+
+@contextlib.asynccontextmanager
+async def connection(db_name="users.db"):
+    """Use the task's current connection, or borrow one from the pool"""
+    conn = _connection.get()
+    if conn is not None:
+        yield conn
+        return
+    pool = get_pool(db_name)
+    conn = await pool.acquire()
+    token = _connection.set(conn)
+    try:
+        yield conn
+    finally:
+        _connection.reset(token)
+        await pool.release(conn)
+
+
+def normalize_query(query):
+    """Collapse whitespace outside quoted literals, leaving literals exact"""
+    parts = QUOTED.split(query.strip())
+    return "".join(
+        part if index % 2 else re.sub(r"\s+", " ", part)
+        for index, part in enumerate(parts)
+    )
+
+
+def read_tables(query):
+    """Return the lower-cased names of every table a statement reads"""
+    tables = set()
+    # Blank out string literals so words inside them are not taken as tables
+    query = re.sub(r"'(?:[^']|'')*'", "''", query)
+    for from_list, joined in READ_SOURCES.findall(query):
+        if joined:
+            tables.add(joined.lower())
+        for item in filter(None, (item.strip() for item in from_list.split(","))):
+            tables.add(TABLE_NAME.match(item).group(1).lower())
+    return frozenset(tables)
+
+
+def _find_query(args, kwargs):
+    """Return the SQL text of a call: the query keyword or first str argument"""
+    query = kwargs.get("query")
+    if query is None:
+        query = next((arg for arg in args if isinstance(arg, str)), None)
+    return query
+
+
+def with_db_connection(func):
+    """Decorator that passes a pooled connection as the first argument"""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        async with connection() as conn:
+            return await func(conn, *args, **kwargs)
+
+    return wrapper
+
+
+def transactional(func):
+    """
+    Decorator that runs the call in a transaction on the task's connection
+    Commits on success and rolls back on error. Nested transactional calls
+    join the outer transaction.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        async with connection() as conn:
+            if _in_transaction.get():
+                return await func(*args, **kwargs)
+            token = _in_transaction.set(True)
+            # Record the tables written during the call from the executed SQL
+            written = set()
+            await conn.set_trace_callback(
+                lambda statement: written.update(WRITE_TABLE.findall(statement))
+            )
+            try:
+                await conn.execute("BEGIN")
+                result = await func(*args, **kwargs)
+                await conn.commit()
+            except Exception as e:
+                await conn.rollback()
+                raise e
+            finally:
+                await conn.set_trace_callback(None)
+                _in_transaction.reset(token)
+        query_cache.invalidate_tables(written)
+        return result
+
+    return wrapper
+
+
+retry_stats = {"calls": 0, "retries": 0, "give_ups": 0}
+
+
+def is_retryable(error):
+    """Tell transient lock contention apart from errors a retry cannot fix"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and any(
+        text in message for text in RETRYABLE_MESSAGES
+    )
+
+
+def retry_on_failure(retries=3, delay=0.1, max_delay=5):
+    """
+    Decorator that retries on lock contention with jittered exponential backoff
+    Waits without blocking the event loop between attempts.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            retry_stats["calls"] += 1
+            for attempt in range(1, retries + 1):
+                try:
+                    return await func(*args, **kwargs)
+                except sqlite3.OperationalError as e:
+                    if not is_retryable(e):
+                        raise
+                    if attempt >= retries:
+                        retry_stats["give_ups"] += 1
+                        raise
+                    retry_stats["retries"] += 1
+                    cap = min(max_delay, delay * 2 ** (attempt - 1))
+                    await asyncio.sleep(random.uniform(0, cap))
+
+        return wrapper
+
+    return decorator
+
+
+class AsyncQueryCache:
+    """
+    Bounded LRU cache of query results with single-flight loading
+    Concurrent misses on the same key share one execution.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._loading = {}
+        # Bumped on every invalidation so a load that overlapped one is not cached
+        self._generation = 0
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0}
+
+    async def get_or_load(self, key, load):
+        """Return the cached result for key, awaiting load() on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] >= time.monotonic():
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0]
+        future = self._loading.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    # This caller itself was cancelled
+                    raise
+                # The loading task was cancelled; load again, maybe as leader
+                return await self.get_or_load(key, load)
+
+        self.stats["misses"] += 1
+        future = self._loading[key] = asyncio.get_running_loop().create_future()
+        generation = self._generation
+        try:
+            result = await load()
+        except BaseException as e:
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                # Waiters re-raise it; mark it retrieved for this caller
+                future.exception()
+            else:
+                # Cancelled or interrupted: wake the waiters so they retry
+                future.cancel()
+            raise
+        finally:
+            del self._loading[key]
+        future.set_result(result)
+        if generation == self._generation:
+            expires_at = time.monotonic() + self.ttl
+            self._entries[key] = (result, expires_at, read_tables(key[0]))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def invalidate_tables(self, tables):
+        """Drop every entry that reads from one of the given tables"""
+        tables = {table.lower() for table in tables}
+        self._generation += 1
+        stale = [key for key, entry in self._entries.items() if entry[2] & tables]
+        for key in stale:
+            del self._entries[key]
+        self.stats["invalidations"] += len(stale)
+
+    def clear(self):
+        """Drop every entry"""
+        self._generation += 1
+        self._entries.clear()
+
+
+query_cache = AsyncQueryCache()
+
+
+def cache_query(func):
+    """
+    Decorator that caches query results by query text and parameters
+    Calls made inside a transaction bypass the cache, since they may see
+    uncommitted writes.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        query = _find_query(args, kwargs)
+        if query is None or _in_transaction.get():
+            return await func(*args, **kwargs)
+        params = tuple(
+            arg
+            for arg in args
+            if arg is not query and not isinstance(arg, aiosqlite.Connection)
+        )
+        key = (
+            normalize_query(query),
+            repr(params),
+            repr(sorted(kwargs.items())),
+        )
+        return await query_cache.get_or_load(key, lambda: func(*args, **kwargs))
+
+    return wrapper
+
+
+query_stats = {}
+
+
+def log_queries(func=None, *, sample_rate=1.0):
+    """
+    Decorator that times every query and logs a sample of them
+    Usable as @log_queries or @log_queries(sample_rate=0.1).
+    """
+    if func is None:
+        return functools.partial(log_queries, sample_rate=sample_rate)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        query = _find_query(args, kwargs)
+        start = time.perf_counter()
+        result = await func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+
+        normalized = LITERALS.sub("?", " ".join(str(query).split()))
+        calls, total = query_stats.get(normalized, (0, 0.0))
+        query_stats[normalized] = (calls + 1, total + seconds)
+        if sample_rate >= 1.0 or random.random() < sample_rate:
+            print(f"Executing SQL query: {query} ({seconds * 1000:.2f} ms)")
+        return result
+
+    return wrapper
+
+
+@log_queries
+@cache_query
+@with_db_connection
+async def fetch_users(conn, query, params=()):
+    async with conn.execute(query, params) as cursor:
+        return await cursor.fetchall()
+
+
+@retry_on_failure(retries=3)
+@transactional
+@with_db_connection
+async def update_user_email(conn, user_id, new_email):
+    await conn.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+
+async def main():
+    try:
+        # Identical concurrent queries run once; the rest share its result
+        users, older, _ = await asyncio.gather(
+            fetch_users(query="SELECT * FROM users"),
+            fetch_users("SELECT * FROM users WHERE age > ?", (40,)),
+            fetch_users(query="SELECT * FROM users"),
+        )
+        await update_user_email(user_id=1, new_email="Crawford_Cartwright@hotmail.com")
+        print(len(users), len(older), query_cache.stats)
+    finally:
+        # Open aiosqlite connections would keep the process from exiting
+        await close_pool()
+
+
+asyncio.run(main())
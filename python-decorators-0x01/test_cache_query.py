@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Tests for single-flight loading in 4-cache_query.py"""
+import contextlib
+import importlib.util
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_cache_module():
+    """Import 4-cache_query.py, whose demo runs against users.db in the cwd"""
+    spec = importlib.util.spec_from_file_location(
+        "cache_query", os.path.join(HERE, "4-cache_query.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Concurrent identical misses must share one execution"""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        conn = sqlite3.connect("users.db")
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.executemany(
+            "INSERT INTO users (name) VALUES (?)", [(f"user{i}",) for i in range(10)]
+        )
+        conn.commit()
+        conn.close()
+        self.module = load_cache_module()
+        self.module.query_cache.clear()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def run_concurrently(self, func, callers):
+        """Release callers threads on func at once; return their outcomes"""
+        barrier = threading.Barrier(callers)
+        outcomes = [None] * callers
+
+        def call(index):
+            barrier.wait()
+            try:
+                outcomes[index] = func()
+            except Exception as e:
+                outcomes[index] = e
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+            self.assertFalse(thread.is_alive(), "a caller is still waiting")
+        return outcomes
+
+    def test_one_database_hit_for_100_callers(self):
+        """100 simultaneous callers of one uncached query run it once"""
+        executions = []
+
+        @self.module.with_db_connection
+        @self.module.cache_query
+        def fetch_users(conn, query):
+            executions.append(query)
+            # Keep the query in flight until every caller has arrived
+            time.sleep(0.2)
+            return conn.execute(query).fetchall()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            outcomes = self.run_concurrently(
+                lambda: fetch_users(query="SELECT * FROM users"), 100
+            )
+        self.assertEqual(len(executions), 1)
+        self.assertTrue(all(len(rows) == 10 for rows in outcomes))
+
+    def test_interrupted_load_releases_waiters(self):
+        """A load that raises a BaseException must not leave waiters hanging"""
+        cache = self.module.query_cache
+        key = cache.make_key("SELECT * FROM users")
+        started = threading.Event()
+
+        def interrupted_load():
+            started.set()
+            time.sleep(0.1)
+            raise KeyboardInterrupt
+
+        def leader():
+            try:
+                cache.get_or_load(key, interrupted_load)
+            except KeyboardInterrupt:
+                pass
+
+        outcome = []
+
+        def follower():
+            try:
+                outcome.append(cache.get_or_load(key, lambda: "follower ran load"))
+            except RuntimeError as e:
+                outcome.append(e)
+
+        thread = threading.Thread(target=leader)
+        thread.start()
+        started.wait()
+        waiter = threading.Thread(target=follower, daemon=True)
+        waiter.start()
+        waiter.join(timeout=5)
+        thread.join()
+        self.assertFalse(waiter.is_alive(), "the follower is still waiting")
+        self.assertIsInstance(outcome[0], RuntimeError)
+        self.assertEqual(cache.get_or_load(key, lambda: ["fresh"]), (False, ["fresh"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,36 +1,39 @@
 import mysql.connector
+import pool
+import query
+import seed
 
 
-def stream_users():
+def stream_users(fetch_size=1000, row_type="dict"):
     """
     Generator function that streams rows from user_data table one by one
+    Args:
+        fetch_size: Number of rows read from the server per round-trip
+        row_type: "dict", "tuple" or "record" (seed.UserRecord)
     Yields:
-        dict: A dictionary representing a single user row
+        A single user row in the requested representation
     """
     try:
-        # Connect to the database
-        connection = mysql.connector.connect(
-            host="localhost", user="root", password="", database="ALX_prodev"
-        )
+        # Check a connection out of the shared pool
+        connection = pool.connect()
 
-        # Use a server-side cursor for efficient fetching
-        cursor = connection.cursor(dictionary=True)
+        # An unbuffered cursor reads rows off the socket as they are fetched,
+        # so at most fetch_size rows are held in client memory
+        cursor = seed.open_cursor(connection, row_type, buffered=False)
 
         # Execute the query
-        cursor.execute("SELECT * FROM user_data")
+        cursor.execute(query.select())
 
         # Yield rows one by one
         while True:
-            row = cursor.fetchone()
-            if row is None:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
                 break
-            yield row
+            yield from seed.as_row_type(rows, row_type)
 
     except mysql.connector.Error as err:
         print(f"Database error: {err}")
     finally:
         # Clean up resources
-        if "cursor" in locals():
-            cursor.close()
         if "connection" in locals():
-            connection.close()
+            seed.close_stream(locals().get("cursor"), connection)
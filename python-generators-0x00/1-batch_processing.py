@@ -1,22 +1,230 @@
 import mysql.connector
+import operator
+import pool
+import query
+import queue
+import seed
 import sys
+import threading
+import time
 
+# Comparisons that can be evaluated either in SQL or in Python
+OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
 
-def stream_users_in_batches(batch_size):
-    """Stream users in batches from database"""
+
+# Marks the end of a read-ahead stream
+_END = object()
+
+
+def _read_ahead(batches, depth):
+    """
+    Generator that runs a batch generator in a background thread
+    The thread fetches up to depth batches ahead of the consumer, so the
+    next batch is read from the server while the current one is processed.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up once the consumer has gone away instead of blocking forever
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for batch in batches:
+                if not put(batch):
+                    break
+        except BaseException as err:
+            put(err)
+        finally:
+            batches.close()
+            put(_END)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
     try:
-        with mysql.connector.connect(
-            host="localhost", user="root", password="", database="ALX_prodev"
-        ) as connection:
-            with connection.cursor(dictionary=True) as cursor:
-                cursor.execute("SELECT * FROM user_data")
+        while True:
+            item = buffer.get()
+            if item is _END:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def stream_users_in_batches(
+    batch_size, where=None, params=(), row_type="dict", prefetch=0
+):
+    """
+    Stream users in batches from database
+    Args:
+        batch_size: Number of users per batch
+        where: Optional SQL condition using %s placeholders,
+            e.g. from query.where_clause
+        params: Values bound to the placeholders in where
+        row_type: "dict", "tuple" or "record" (seed.UserRecord)
+        prefetch: Batches to read ahead in a background thread (0 disables)
+    Yields:
+        list: A batch of users in the requested representation
+    """
+    batches = _fetch_batches(batch_size, where, params, row_type)
+    if prefetch:
+        yield from _read_ahead(batches, prefetch)
+    else:
+        yield from batches
+
+
+def _fetch_batches(batch_size, where, params, row_type):
+    """Generator that reads the batches for stream_users_in_batches"""
+    sql = query.select()
+    if where:
+        sql += f" WHERE {where}"
+    try:
+        with pool.connect() as connection:
+            with seed.open_cursor(connection, row_type) as cursor:
+                cursor.execute(sql, params)
                 while batch := cursor.fetchmany(batch_size):
-                    yield batch
+                    yield seed.as_row_type(batch, row_type)
     except mysql.connector.Error as err:
         print(f"Database error: {err}", file=sys.stderr)
 
 
+class Pipeline:
+    """
+    Composable streaming pipeline over stream_users_in_batches
+    Stages run batch by batch in the order they are added. where()
+    comparisons on table columns that come before any map or project are
+    pushed down into the SQL WHERE clause; everything else runs in Python.
+    Per-stage row counts and timings of the last run are kept in stats.
+    """
+
+    def __init__(self, batch_size=100, row_type="dict", prefetch=0):
+        self.batch_size = batch_size
+        # "dict" or "record"; stages index rows by column name
+        self.row_type = row_type
+        self.prefetch = prefetch
+        self.stages = []
+        self.stats = []
+
+    def where(self, column, op, value):
+        """Keep rows where `column op value` holds, in SQL when possible"""
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported operator: {op}")
+        self.stages.append(("where", (column, op, value)))
+        return self
+
+    def filter(self, predicate):
+        """Keep rows for which predicate(row) is true"""
+        self.stages.append(("filter", predicate))
+        return self
+
+    def map(self, func):
+        """Replace every row with func(row)"""
+        self.stages.append(("map", func))
+        return self
+
+    def project(self, *columns):
+        """Keep only the given columns of every row"""
+        self.stages.append(("project", columns))
+        return self
+
+    def aggregate(self, func, initial):
+        """
+        Run the pipeline and fold every row into a single value
+        Args:
+            func: Callable taking (accumulator, row) and returning the accumulator
+            initial: Starting accumulator value
+        Returns:
+            The final accumulator
+        """
+        result = initial
+        for row in self:
+            result = func(result, row)
+        return result
+
+    def _plan(self):
+        """Split the stages into pushed-down SQL conditions and Python stages"""
+        conditions = []
+        params = []
+        stages = []
+        reshaped = False
+        for kind, arg in self.stages:
+            reshaped = reshaped or kind in ("map", "project")
+            # Until a map or project the rows are still table rows, and
+            # predicates commute, so column comparisons can run in SQL
+            if kind == "where" and not reshaped and arg[0] in query.COLUMNS:
+                column, op, value = arg
+                conditions.append((column, op))
+                params.append(value)
+            else:
+                stages.append((kind, arg))
+        return query.where_clause(conditions), tuple(params), stages
+
+    @staticmethod
+    def _apply(kind, arg, batch):
+        """Apply one stage to a batch of rows"""
+        if kind == "where":
+            column, op, value = arg
+            compare = OPERATORS[op]
+            return [row for row in batch if compare(row[column], value)]
+        if kind == "filter":
+            return [row for row in batch if arg(row)]
+        if kind == "map":
+            return [arg(row) for row in batch]
+        return [{column: row[column] for column in arg} for row in batch]
+
+    def __iter__(self):
+        """Stream the rows that come out of the last stage"""
+        where, params, stages = self._plan()
+        source = {"stage": "source", "where": where, "rows": 0, "seconds": 0.0}
+        self.stats = [source] + [
+            {"stage": kind, "rows": 0, "seconds": 0.0} for kind, _ in stages
+        ]
+
+        batches = stream_users_in_batches(
+            self.batch_size, where, params, self.row_type, self.prefetch
+        )
+        try:
+            while True:
+                start = time.perf_counter()
+                batch = next(batches, None)
+                source["seconds"] += time.perf_counter() - start
+                if batch is None:
+                    break
+                source["rows"] += len(batch)
+
+                for (kind, arg), stat in zip(stages, self.stats[1:]):
+                    stat["rows"] += len(batch)
+                    start = time.perf_counter()
+                    batch = self._apply(kind, arg, batch)
+                    stat["seconds"] += time.perf_counter() - start
+                yield from batch
+        finally:
+            batches.close()
+
+    def report(self):
+        """Print the rows per second handled by each stage of the last run"""
+        for stat in self.stats:
+            rate = stat["rows"] / stat["seconds"] if stat["seconds"] else 0.0
+            print(f"{stat['stage']}: {stat['rows']} rows, {rate:.0f} rows/s")
+
+
 def batch_processing(batch_size):
-    """Yield users over 25 from batched stream"""
-    for batch in stream_users_in_batches(batch_size):
-        return (user for user in batch if user["age"] > 25)
+    """Yield users over 25 from every batch of the stream"""
+    yield from Pipeline(batch_size).where("age", ">", 25)
@@ -1,23 +1,81 @@
 #!/usr/bin/python3
+import query
 import seed
 
 
-def paginate_users(page_size, offset):
+def paginate_users(page_size, offset, connection=None):
     """Fetch a page of users from the database"""
-    connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
-    rows = cursor.fetchall()
-    connection.close()
-    return rows
+    own_connection = connection is None
+    if own_connection:
+        connection = seed.connect_to_prodev()
+    try:
+        sql = query.select(order_by="user_id", limit=True, offset=True)
+        cursor = query.prepared_cursor(connection, sql)
+        cursor.execute(sql, (page_size, offset))
+        return query.fetch_dicts(cursor)
+    finally:
+        if own_connection:
+            connection.close()
+
+
+def paginate_users_after(page_size, last_user_id, connection=None):
+    """
+    Fetch the page of users that follows last_user_id (keyset pagination)
+    Seeking on the primary key costs the same for every page, unlike OFFSET
+    which has to scan and discard all the rows before the page.
+    Args:
+        page_size: Number of users per page
+        last_user_id: user_id of the last row of the previous page, or None
+        connection: Optional open connection to reuse
+    Returns:
+        list: Dictionaries for the users on the page
+    """
+    own_connection = connection is None
+    if own_connection:
+        connection = seed.connect_to_prodev()
+    try:
+        if last_user_id is None:
+            sql = query.select(order_by="user_id", limit=True)
+            params = (page_size,)
+        else:
+            sql = query.select(
+                where=(("user_id", ">"),), order_by="user_id", limit=True
+            )
+            params = (last_user_id, page_size)
+        cursor = query.prepared_cursor(connection, sql)
+        cursor.execute(sql, params)
+        return query.fetch_dicts(cursor)
+    finally:
+        if own_connection:
+            connection.close()
 
 
-def lazy_paginate(page_size):
-    """Generator that lazily paginates through users"""
-    offset = 0
-    while True:
-        page = paginate_users(page_size, offset)
-        if not page:  # No more users
-            break
-        yield page
-        offset += page_size
+def lazy_paginate(page_size, strategy="keyset"):
+    """
+    Generator that lazily paginates through users
+    Args:
+        page_size: Number of users per page
+        strategy: "keyset" to seek on user_id, "offset" for LIMIT/OFFSET
+    Yields:
+        list: One page of users
+    """
+    if strategy not in ("keyset", "offset"):
+        raise ValueError(f"Unknown pagination strategy: {strategy}")
+
+    # One connection serves every page instead of reconnecting per page
+    connection = seed.connect_to_prodev()
+    try:
+        offset = 0
+        last_user_id = None
+        while True:
+            if strategy == "keyset":
+                page = paginate_users_after(page_size, last_user_id, connection)
+            else:
+                page = paginate_users(page_size, offset, connection)
+            if not page:  # No more users
+                break
+            yield page
+            offset += page_size
+            last_user_id = page[-1]["user_id"]
+    finally:
+        connection.close()
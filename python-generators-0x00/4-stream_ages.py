@@ -1,44 +1,55 @@
 #!/usr/bin/python3
 import mysql.connector
 import sys
+import aggregate
+import pool
+import query
+import seed
 
 
-def stream_user_ages():
+def stream_user_ages(fetch_size=1000):
     """
     Generator that streams user ages one by one from the database
+    Args:
+        fetch_size: Number of rows read from the server per round-trip
     Yields:
         int: User age
     """
     try:
-        connection = mysql.connector.connect(
-            host="localhost", user="root", password="", database="ALX_prodev"
-        )
-        cursor = connection.cursor()
+        connection = pool.connect()
+        # Unbuffered so the result set is streamed rather than loaded up front
+        cursor = connection.cursor(buffered=False)
 
         # Only select age column to minimize data transfer
-        cursor.execute("SELECT age FROM user_data")
+        cursor.execute(query.select(("age",)))
 
         while True:
-            row = cursor.fetchone()
-            if row is None:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
                 break
-            yield row[0]  # Yield just the age
+            for row in rows:
+                yield row[0]  # Yield just the age
 
     except mysql.connector.Error as err:
         print(f"Database error: {err}", file=sys.stderr)
     finally:
-        if "cursor" in locals():
-            cursor.close()
         if "connection" in locals():
-            connection.close()
+            seed.close_stream(locals().get("cursor"), connection)
 
 
-def calculate_average_age():
+def calculate_average_age(method="stream"):
     """
     Calculates average age using the streaming generator
+    Args:
+        method: "stream" to sum ages in Python, or "sql"/"numpy" to use the
+            aggregate module (AVG in MySQL, or NumPy over fetchmany blocks)
     Returns:
         float: Average age of all users
     """
+    if method != "stream":
+        mean = aggregate.age_stats(method, percentiles=(), bins=0)["mean"]
+        return mean if mean is not None else 0.0
+
     total = 0
     count = 0
 
@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+"""Aggregations of user_data.age, pushed down to MySQL or vectorised with NumPy"""
+import math
+import seed
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for method="numpy"
+    np = None
+
+
+def _nearest_rank(count, percentile):
+    """Return the 0-based index of the nearest-rank percentile"""
+    return max(math.ceil(percentile / 100 * count), 1) - 1
+
+
+def _sql_stats(connection, percentiles, bins):
+    """Compute the statistics with aggregate queries run by MySQL"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*), AVG(age), MIN(age), MAX(age) FROM user_data")
+        count, mean, low, high = cursor.fetchone()
+        stats = {"count": count, "mean": None, "min": None, "max": None}
+        if not count:
+            return stats
+        stats.update(mean=float(mean), min=int(low), max=int(high))
+
+        stats["percentiles"] = {}
+        for percentile in percentiles:
+            cursor.execute(
+                "SELECT age FROM user_data ORDER BY age LIMIT 1 OFFSET %s",
+                (_nearest_rank(count, percentile),),
+            )
+            stats["percentiles"][percentile] = int(cursor.fetchone()[0])
+
+        if bins:
+            width = (stats["max"] - stats["min"]) / bins or 1
+            # The top edge belongs to the last bin, as with numpy.histogram
+            cursor.execute(
+                "SELECT LEAST(FLOOR((age - %s) / %s), %s) AS bucket, COUNT(*) "
+                "FROM user_data GROUP BY bucket ORDER BY bucket",
+                (stats["min"], width, bins - 1),
+            )
+            counts = [0] * bins
+            for bucket, bucket_count in cursor.fetchall():
+                counts[int(bucket)] = bucket_count
+            edges = [stats["min"] + width * i for i in range(bins + 1)]
+            stats["histogram"] = {"edges": edges, "counts": counts}
+        return stats
+    finally:
+        cursor.close()
+
+
+def _numpy_stats(connection, percentiles, bins, fetch_size):
+    """Pull the age column in large blocks and compute the statistics in NumPy"""
+    if np is None:
+        raise ImportError("method='numpy' requires numpy to be installed")
+
+    blocks = []
+    cursor = connection.cursor(buffered=False)
+    try:
+        cursor.execute("SELECT CAST(age AS SIGNED) FROM user_data")
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            blocks.append(
+                np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            )
+    finally:
+        cursor.close()
+
+    ages = np.concatenate(blocks) if blocks else np.empty(0, dtype=np.int64)
+    stats = {"count": int(ages.size), "mean": None, "min": None, "max": None}
+    if not ages.size:
+        return stats
+    stats.update(mean=float(ages.mean()), min=int(ages.min()), max=int(ages.max()))
+
+    # inverted_cdf is the nearest-rank definition used by the SQL path
+    stats["percentiles"] = {
+        percentile: int(np.percentile(ages, percentile, method="inverted_cdf"))
+        for percentile in percentiles
+    }
+
+    if bins:
+        high = stats["max"] if stats["max"] > stats["min"] else stats["min"] + bins
+        counts, edges = np.histogram(ages, bins=bins, range=(stats["min"], high))
+        stats["histogram"] = {"edges": edges.tolist(), "counts": counts.tolist()}
+    return stats
+
+
+def age_stats(
+    method="sql", percentiles=(50, 90, 99), bins=10, fetch_size=100_000, connection=None
+):
+    """
+    Compute count, mean, min, max, percentiles and a histogram of user ages
+    Args:
+        method: "sql" to aggregate in MySQL, "numpy" to aggregate client-side
+        percentiles: Nearest-rank percentiles to compute (0-100)
+        bins: Number of equal-width histogram bins, or 0 to skip the histogram
+        fetch_size: Rows per fetchmany block for the numpy method
+        connection: Optional open connection to reuse
+    Returns:
+        dict: count, mean, min, max and, when the table has rows,
+        percentiles and histogram (edges and counts)
+    """
+    if method not in ("sql", "numpy"):
+        raise ValueError(f"Unknown aggregation method: {method}")
+
+    own_connection = connection is None
+    if own_connection:
+        connection = seed.connect_to_prodev()
+    try:
+        if method == "sql":
+            return _sql_stats(connection, percentiles, bins)
+        return _numpy_stats(connection, percentiles, bins, fetch_size)
+    finally:
+        if own_connection:
+            connection.close()
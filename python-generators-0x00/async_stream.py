@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+"""Async generator versions of the user_data streaming generators"""
+import pool
+import query
+
+try:
+    import aiomysql
+except ImportError:  # Only needed when connecting to MySQL
+    aiomysql = None
+
+
+async def connect():
+    """Open an aiomysql connection to ALX_prodev using pool.DB_CONFIG"""
+    if aiomysql is None:
+        raise ImportError("async_stream requires aiomysql to be installed")
+    config = dict(pool.DB_CONFIG)
+    config["db"] = config.pop("database")
+    return await aiomysql.connect(**config)
+
+
+def _is_sqlite(connection):
+    """Tell an aiosqlite stand-in connection apart from an aiomysql one"""
+    return type(connection).__module__.startswith("aiosqlite")
+
+
+async def _close(connection):
+    """Close a connection without reading any pending result"""
+    if _is_sqlite(connection):
+        await connection.close()
+    else:
+        connection.close()
+
+
+async def _fetch_all(connection, sql, params):
+    """Run a small query and return all of its rows as dictionaries"""
+    if _is_sqlite(connection):
+        cursor = await connection.execute(sql.replace("%s", "?"), params)
+    else:
+        cursor = await connection.cursor()
+        await cursor.execute(sql, params)
+    try:
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in await cursor.fetchall()]
+    finally:
+        await cursor.close()
+
+
+async def _stream_query(sql, params, fetch_size, connection):
+    """
+    Async generator that streams a query in blocks of at most fetch_size rows
+    MySQL results are read through a server-side cursor, so the next block
+    is only pulled off the socket when the consumer asks for it; a slow
+    consumer therefore holds back the server instead of buffering the table.
+    Args:
+        sql: SQL using %s placeholders
+        params: Values bound to the placeholders
+        fetch_size: Maximum rows per block
+        connection: Open aiomysql/aiosqlite connection, or None to open one
+    Yields:
+        tuple: (column names, list of row tuples)
+    """
+    own_connection = connection is None
+    if own_connection:
+        connection = await connect()
+    cursor = None
+    finished = False
+    try:
+        if _is_sqlite(connection):
+            cursor = await connection.execute(sql.replace("%s", "?"), params)
+        else:
+            cursor = await connection.cursor(aiomysql.SSCursor)
+            await cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        while True:
+            rows = await cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield columns, rows
+        finished = True
+    finally:
+        # Closing an unfinished server-side cursor reads and discards the rest
+        # of the result, so an owned connection is simply dropped instead
+        if cursor is not None and (finished or not own_connection):
+            await cursor.close()
+        if own_connection:
+            await _close(connection)
+
+
+async def stream_users(fetch_size=1000, connection=None):
+    """
+    Async generator that streams rows from user_data one by one
+    Args:
+        fetch_size: Number of rows read from the server per round-trip
+        connection: Optional open connection to reuse
+    Yields:
+        dict: A dictionary representing a single user row
+    """
+    blocks = _stream_query(query.select(), (), fetch_size, connection)
+    try:
+        async for columns, rows in blocks:
+            for row in rows:
+                yield dict(zip(columns, row))
+    finally:
+        # Release the cursor as soon as the consumer stops
+        await blocks.aclose()
+
+
+async def stream_users_in_batches(batch_size, connection=None):
+    """
+    Async generator that streams users in batches
+    Args:
+        batch_size: Number of users per batch
+        connection: Optional open connection to reuse
+    Yields:
+        list: A batch of user dictionaries
+    """
+    blocks = _stream_query(query.select(), (), batch_size, connection)
+    try:
+        async for columns, rows in blocks:
+            yield [dict(zip(columns, row)) for row in rows]
+    finally:
+        # Release the cursor as soon as the consumer stops
+        await blocks.aclose()
+
+
+async def lazy_paginate(page_size, connection=None):
+    """
+    Async generator that lazily paginates through users by keyset on user_id
+    Args:
+        page_size: Number of users per page
+        connection: Optional open connection to reuse
+    Yields:
+        list: One page of users
+    """
+    own_connection = connection is None
+    if own_connection:
+        connection = await connect()
+    try:
+        page = await _fetch_all(
+            connection,
+            query.select(order_by="user_id", limit=True),
+            (page_size,),
+        )
+        while page:
+            yield page
+            page = await _fetch_all(
+                connection,
+                query.select(
+                    where=(("user_id", ">"),), order_by="user_id", limit=True
+                ),
+                (page[-1]["user_id"], page_size),
+            )
+    finally:
+        if own_connection:
+            await _close(connection)
+
+
+async def stream_user_ages(fetch_size=1000, connection=None):
+    """
+    Async generator that streams user ages one by one
+    Args:
+        fetch_size: Number of rows read from the server per round-trip
+        connection: Optional open connection to reuse
+    Yields:
+        int: User age
+    """
+    blocks = _stream_query(query.select(("age",)), (), fetch_size, connection)
+    try:
+        async for _, rows in blocks:
+            for row in rows:
+                yield row[0]
+    finally:
+        # Release the cursor as soon as the consumer stops
+        await blocks.aclose()
@@ -0,0 +1,486 @@
+#!/usr/bin/python3
+"""Benchmarks for the user_data generators"""
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+
+import schema
+import seed
+
+calculate_average_age = __import__("4-stream_ages").calculate_average_age
+stream_users = __import__("0-stream_users").stream_users
+stream_users_in_batches = __import__("1-batch_processing").stream_users_in_batches
+lazy_paginate_module = __import__("2-lazy_paginate")
+stream_user_ages = __import__("4-stream_ages").stream_user_ages
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in KiB on Linux and in bytes on macOS
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def bench_stream_memory(
+    generator, checkpoints=(10_000, 100_000, 1_000_000, 10_000_000), fetch_size=1000
+):
+    """
+    Stream rows and record peak RSS each time a checkpoint row count is reached
+    A streaming generator keeps peak RSS flat across checkpoints, while a
+    buffered one pays for the whole table before the first row is yielded.
+    Args:
+        generator: Generator function accepting fetch_size
+        checkpoints: Row counts at which peak RSS is sampled
+        fetch_size: Rows fetched from the server per round-trip
+    Returns:
+        list: Dictionaries with rows, seconds and peak_rss_mb per checkpoint
+    """
+    results = []
+    remaining = sorted(checkpoints)
+    start = time.perf_counter()
+    rows = 0
+    stream = generator(fetch_size)
+    try:
+        for _ in stream:
+            rows += 1
+            if rows == remaining[0]:
+                results.append(
+                    {
+                        "rows": rows,
+                        "seconds": time.perf_counter() - start,
+                        "peak_rss_mb": peak_rss_mb(),
+                    }
+                )
+                remaining.pop(0)
+                if not remaining:
+                    break
+    finally:
+        stream.close()
+    return results
+
+
+def bench_page_latency(page=1000, page_size=100, repeat=20):
+    """
+    Compare the latency of fetching one late page with OFFSET and with keyset
+    Args:
+        page: 1-based page number to fetch
+        page_size: Number of users per page
+        repeat: Number of timed fetches per strategy
+    Returns:
+        list: Dictionaries with the median and best latency per strategy
+    """
+    offset = (page - 1) * page_size
+    connection = seed.connect_to_prodev()
+    try:
+        # The keyset strategy needs the last id of the previous page
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT user_id FROM user_data ORDER BY user_id LIMIT 1 OFFSET %s",
+            (offset - 1,),
+        )
+        row = cursor.fetchone()
+        cursor.close()
+        if row is None:
+            print(f"user_data has fewer than {offset} rows")
+            return []
+        last_user_id = row[0]
+
+        strategies = {
+            "offset": lambda: lazy_paginate_module.paginate_users(
+                page_size, offset, connection
+            ),
+            "keyset": lambda: lazy_paginate_module.paginate_users_after(
+                page_size, last_user_id, connection
+            ),
+        }
+        results = []
+        for strategy, fetch in strategies.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fetch()
+                timings.append((time.perf_counter() - start) * 1000)
+            results.append(
+                {
+                    "strategy": strategy,
+                    "page": page,
+                    "median_ms": statistics.median(timings),
+                    "best_ms": min(timings),
+                }
+            )
+        return results
+    finally:
+        connection.close()
+
+
+def bench_average_age(methods=("stream", "sql", "numpy"), repeat=3):
+    """
+    Time calculate_average_age with each aggregation method
+    Meant to be run against a table of 1M+ rows.
+    Args:
+        methods: Aggregation methods to compare
+        repeat: Number of timed runs per method
+    Returns:
+        list: Dictionaries with the average and best time per method
+    """
+    results = []
+    for method in methods:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            average = calculate_average_age(method)
+            timings.append(time.perf_counter() - start)
+        results.append(
+            {
+                "method": method,
+                "average_age": average,
+                "mean_s": statistics.mean(timings),
+                "best_s": min(timings),
+            }
+        )
+    return results
+
+
+def bench_row_types(rows=1_000_000):
+    """
+    Compare building dict, tuple and UserRecord rows from raw row tuples
+    Runs without a database, on synthetic rows shaped like user_data.
+    Args:
+        rows: Number of rows to convert per representation
+    Returns:
+        list: Dictionaries with throughput, allocated blocks and bytes per row
+    """
+    columns = ("user_id", "name", "email", "age")
+    raw = [
+        (str(uuid.UUID(int=i)), f"user{i}", f"user{i}@example.com", i % 100)
+        for i in range(rows)
+    ]
+    builders = {
+        "dict": lambda row: dict(zip(columns, row)),
+        "tuple": lambda row: row,
+        "record": lambda row: seed.UserRecord(*row),
+    }
+    results = []
+    for row_type, build in builders.items():
+        start = time.perf_counter()
+        converted = [build(row) for row in raw]
+        seconds = time.perf_counter() - start
+
+        # Measure the memory retained by the converted rows separately
+        del converted
+        blocks = sys.getallocatedblocks()
+        tracemalloc.start()
+        converted = [build(row) for row in raw]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        blocks = sys.getallocatedblocks() - blocks
+        del converted
+
+        results.append(
+            {
+                "row_type": row_type,
+                "rows_per_s": rows / seconds,
+                "blocks_per_row": blocks / rows,
+                "bytes_per_row": size / rows,
+            }
+        )
+    return results
+
+
+# Representative query of each generator, as (name, SQL, params)
+GENERATOR_QUERIES = (
+    ("stream_users", "SELECT * FROM user_data", ()),
+    ("batch_processing", "SELECT * FROM user_data WHERE `age` > %s", (25,)),
+    ("stream_user_ages", "SELECT age FROM user_data", ()),
+    ("average_age_sql", "SELECT COUNT(*), AVG(age) FROM user_data", ()),
+    ("percentile_age_sql", "SELECT age FROM user_data ORDER BY age LIMIT 1", ()),
+    ("email_lookup", "SELECT * FROM user_data WHERE email = %s", ("x@example.com",)),
+)
+
+
+def _time_queries(connection, repeat):
+    """Return the best time in seconds of each generator query"""
+    timings = {}
+    for name, query, params in GENERATOR_QUERIES:
+        best = None
+        for _ in range(repeat):
+            cursor = connection.cursor(buffered=False)
+            start = time.perf_counter()
+            cursor.execute(query, params)
+            while cursor.fetchmany(10_000):
+                pass
+            elapsed = time.perf_counter() - start
+            cursor.close()
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+    return timings
+
+
+def bench_schema(repeat=3):
+    """
+    Time each generator query, apply schema.migrate, then time them again
+    This alters user_data, so run it against a benchmark copy of the data.
+    Args:
+        repeat: Number of timed runs per query; the best is kept
+    Returns:
+        list: Dictionaries with before/after seconds and speedup per query
+    """
+    connection = seed.connect_to_prodev()
+    try:
+        before = _time_queries(connection, repeat)
+        schema.migrate(connection)
+        after = _time_queries(connection, repeat)
+    finally:
+        connection.close()
+    return [
+        {
+            "query": name,
+            "before_s": before[name],
+            "after_s": after[name],
+            "speedup": before[name] / after[name] if after[name] else 0.0,
+        }
+        for name, _, _ in GENERATOR_QUERIES
+    ]
+
+
+class LatencySample:
+    """Fixed-size reservoir of latencies, so long runs use constant memory"""
+
+    def __init__(self, size=100_000, seed_value=0):
+        self.size = size
+        self.seen = 0
+        self.samples = []
+        self._rng = random.Random(seed_value)
+
+    def add(self, seconds):
+        """Record one latency, keeping a uniform sample of all of them"""
+        self.seen += 1
+        if len(self.samples) < self.size:
+            self.samples.append(seconds)
+        else:
+            slot = self._rng.randrange(self.seen)
+            if slot < self.size:
+                self.samples[slot] = seconds
+
+    def percentiles(self, points=(50, 95, 99)):
+        """Return nearest-rank percentiles in milliseconds"""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {f"p{point}_ms": None for point in points}
+        return {
+            f"p{point}_ms": ordered[max(math.ceil(point / 100 * len(ordered)), 1) - 1]
+            * 1000
+            for point in points
+        }
+
+
+def measure(make_iterable, count_rows=lambda item: 1):
+    """
+    Consume an iterable and time the wait before every item
+    Args:
+        make_iterable: Callable returning the generator to consume
+        count_rows: Callable giving the number of rows in one item
+    Returns:
+        dict: rows, items, seconds, rows_per_s and latency percentiles
+    """
+    latencies = LatencySample()
+    rows = 0
+    start = last = time.perf_counter()
+    for item in make_iterable():
+        now = time.perf_counter()
+        latencies.add(now - last)
+        last = now
+        rows += count_rows(item)
+    seconds = time.perf_counter() - start
+    result = {
+        "rows": rows,
+        "items": latencies.seen,
+        "seconds": seconds,
+        "rows_per_s": rows / seconds if seconds else 0.0,
+    }
+    result.update(latencies.percentiles())
+    return result
+
+
+def run_isolated(func):
+    """
+    Run a benchmark in a forked child so its peak RSS is measured on its own
+    Returns:
+        dict: The benchmark result plus peak_rss_mb, or an error entry
+    """
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+
+    def target():
+        try:
+            result = func()
+            result["peak_rss_mb"] = peak_rss_mb()
+        except Exception as err:
+            result = {"error": repr(err)}
+        sender.send(result)
+
+    process = context.Process(target=target)
+    process.start()
+    # Drop the parent's end so recv() sees EOF if the child dies silently
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = None
+    finally:
+        receiver.close()
+    process.join()
+    if process.exitcode != 0:
+        # e.g. killed by the OOM killer before or after sending its result
+        return {"error": f"benchmark process exited with code {process.exitcode}"}
+    if result is None:
+        return {"error": "benchmark process exited without a result"}
+    return result
+
+
+def _table_rows():
+    """Return the number of rows in user_data"""
+    connection = seed.connect_to_prodev()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        (rows,) = cursor.fetchone()
+        cursor.close()
+        return rows
+    finally:
+        connection.close()
+
+
+def _time_average_age():
+    """Time one calculate_average_age call"""
+    start = time.perf_counter()
+    average = calculate_average_age()
+    return {"seconds": time.perf_counter() - start, "average_age": float(average)}
+
+
+def bench_suite(batch_size=1000, page_size=1000):
+    """
+    Run every generator over the whole table, each in its own process
+    Load a synthetic table first (python3 synthetic.py ROWS) to test at scale.
+    Args:
+        batch_size: Fetch size for streams and batch size for batches
+        page_size: Page size for lazy_paginate
+    Returns:
+        list: One dictionary per generator with throughput, latency
+        percentiles and peak memory
+    """
+    rows = _table_rows()
+    benchmarks = {
+        "stream_users": lambda: measure(lambda: stream_users(batch_size)),
+        "stream_users_in_batches": lambda: measure(
+            lambda: stream_users_in_batches(batch_size), len
+        ),
+        "lazy_paginate": lambda: measure(
+            lambda: lazy_paginate_module.lazy_paginate(page_size), len
+        ),
+        "stream_user_ages": lambda: measure(lambda: stream_user_ages(batch_size)),
+        "calculate_average_age": _time_average_age,
+    }
+    results = []
+    for name, func in benchmarks.items():
+        result = {"generator": name, "table_rows": rows}
+        result.update(run_isolated(func))
+        if name == "calculate_average_age" and result.get("seconds"):
+            result["rows_per_s"] = rows / result["seconds"]
+        results.append(result)
+    return results
+
+
+def bench_prefetch(batch_size=1000, work_ms=5.0, depths=(0, 1, 2, 4)):
+    """
+    Measure how much read-ahead overlaps fetching with batch processing
+    Processing is simulated by sleeping work_ms per batch, which stands in
+    for I/O-bound consumers that release the GIL.
+    Args:
+        batch_size: Number of users per batch
+        work_ms: Simulated processing time per batch in milliseconds
+        depths: Prefetch depths to compare; 0 is the serial baseline
+    Returns:
+        list: Dictionaries with seconds and speedup over the baseline per depth
+    """
+    results = []
+    baseline = None
+    for depth in depths:
+        start = time.perf_counter()
+        batches = 0
+        for _ in stream_users_in_batches(batch_size, prefetch=depth):
+            time.sleep(work_ms / 1000)
+            batches += 1
+        seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        results.append(
+            {
+                "prefetch": depth,
+                "batches": batches,
+                "seconds": seconds,
+                "speedup": baseline / seconds if seconds else 0.0,
+            }
+        )
+    return results
+
+
+def report(name, results):
+    """Print one line per benchmark result"""
+    print(name)
+    for result in results:
+        fields = (
+            f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in result.items()
+        )
+        print("  " + ", ".join(fields))
+
+
+BENCHMARKS = {
+    "suite": bench_suite,
+    "stream_users": lambda: bench_stream_memory(stream_users),
+    "stream_user_ages": lambda: bench_stream_memory(stream_user_ages),
+    "page_latency": bench_page_latency,
+    "average_age": bench_average_age,
+    "row_types": bench_row_types,
+    "schema": bench_schema,
+    "prefetch": bench_prefetch,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the user_data generators")
+    parser.add_argument(
+        "names",
+        nargs="*",
+        default=["suite"],
+        help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: suite)",
+    )
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    # Peak RSS is per process, so memory benchmarks are best run one at a time
+    results = {}
+    for name in args.names:
+        results[name] = BENCHMARKS[name]()
+        report(name, results[name])
+    if args.json:
+        with open(args.json, mode="w") as file:
+            json.dump(
+                {"created": time.time(), "results": results},
+                file,
+                indent=2,
+                default=str,
+            )
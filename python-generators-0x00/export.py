@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+"""Columnar snapshots of user_data as Arrow IPC or Parquet files"""
+import os
+import mysql.connector
+import seed
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is only needed by this module
+    pa = None
+    pq = None
+
+
+def _require_pyarrow():
+    """Fail early with a clear message when pyarrow is missing"""
+    if pa is None:
+        raise ImportError("Columnar export requires pyarrow to be installed")
+
+
+def user_schema():
+    """Return the Arrow schema of a user_data snapshot"""
+    _require_pyarrow()
+    return pa.schema(
+        [
+            ("user_id", pa.string()),
+            ("name", pa.string()),
+            ("email", pa.string()),
+            ("age", pa.int32()),
+        ]
+    )
+
+
+def record_batches(connection, chunk_size=100_000):
+    """
+    Generator that reads user_data in large chunks as Arrow record batches
+    Args:
+        connection: MySQL database connection
+        chunk_size: Number of rows per record batch
+    Yields:
+        pyarrow.RecordBatch: One chunk of user_data
+    """
+    schema = user_schema()
+    cursor = connection.cursor(buffered=False)
+    try:
+        cursor.execute(
+            "SELECT user_id, name, email, CAST(age AS SIGNED) FROM user_data"
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            # Transpose the row tuples into one array per column
+            arrays = [
+                pa.array(column, type=field.type)
+                for column, field in zip(zip(*rows), schema)
+            ]
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+    finally:
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass  # Unread rows are discarded with the connection
+
+
+def export_snapshot(
+    path, file_format=None, compression=None, chunk_size=100_000, connection=None
+):
+    """
+    Write user_data to an Arrow IPC or Parquet file
+    The file is written next to path and renamed into place when complete,
+    so readers never see a partial snapshot.
+    Args:
+        path: Destination file; ".parquet" selects Parquet unless file_format is set
+        file_format: "arrow" or "parquet"
+        compression: e.g. "zstd"; leave unset for Arrow files that should be
+            memory-mapped without decompressing
+        chunk_size: Number of rows per record batch
+        connection: Optional open connection to reuse
+    Returns:
+        int: Number of rows written
+    """
+    schema = user_schema()
+    file_format = file_format or ("parquet" if path.endswith(".parquet") else "arrow")
+    if file_format not in ("arrow", "parquet"):
+        raise ValueError(f"Unknown snapshot format: {file_format}")
+
+    own_connection = connection is None
+    if own_connection:
+        connection = seed.connect_to_prodev()
+    tmp_path = f"{path}.tmp"
+    rows = 0
+    try:
+        if file_format == "parquet":
+            writer = pq.ParquetWriter(
+                tmp_path, schema, compression=compression or "none"
+            )
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            writer = pa.ipc.new_file(tmp_path, schema, options=options)
+        with writer:
+            for batch in record_batches(connection, chunk_size):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if own_connection:
+            connection.close()
+    return rows
+
+
+def read_snapshot(path):
+    """
+    Open a snapshot written by export_snapshot as a memory-mapped Arrow table
+    Uncompressed Arrow files are read zero-copy: the table's buffers point
+    straight into the mapped file and pages are loaded on first access.
+    Args:
+        path: Snapshot file
+    Returns:
+        pyarrow.Table: The user_data snapshot
+    """
+    _require_pyarrow()
+    if path.endswith(".parquet"):
+        return pq.read_table(path, memory_map=True)
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+"""Partitioned scans of user_data streamed concurrently from worker processes"""
+import multiprocessing
+import os
+from queue import Empty
+import query
+import seed
+
+_DONE = "done"
+_ERROR = "error"
+_ROWS = "rows"
+# How often the consumer checks for workers that died without finishing
+_POLL_SECONDS = 1.0
+
+
+def hash_partitions(count):
+    """
+    Split user_data into hash buckets of user_id
+    No index serves the bucket condition, so every partition scans the
+    whole table; prefer range_partitions() unless user_ids are unordered
+    and ranges would be badly skewed.
+    Args:
+        count: Number of partitions
+    Returns:
+        list: (where, params) pairs, one per partition
+    """
+    return [
+        ("MOD(CRC32(user_id), %s) = %s", (count, bucket)) for bucket in range(count)
+    ]
+
+
+def range_partitions(count, connection=None):
+    """
+    Split user_data into contiguous user_id ranges of roughly equal size
+    Args:
+        count: Number of partitions
+        connection: Optional open connection to reuse
+    Returns:
+        list: (where, params) pairs, one per partition
+    """
+    own_connection = connection is None
+    if own_connection:
+        connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        total = cursor.fetchone()[0]
+        bounds = []
+        for index in range(1, count):
+            cursor.execute(
+                "SELECT user_id FROM user_data ORDER BY user_id LIMIT 1 OFFSET %s",
+                (total * index // count,),
+            )
+            row = cursor.fetchone()
+            if row is not None and (not bounds or row[0] > bounds[-1]):
+                bounds.append(row[0])
+    finally:
+        cursor.close()
+        if own_connection:
+            connection.close()
+
+    if not bounds:
+        return [("1 = 1", ())]
+    partitions = [("user_id < %s", (bounds[0],))]
+    for low, high in zip(bounds, bounds[1:]):
+        partitions.append(("user_id >= %s AND user_id < %s", (low, high)))
+    partitions.append(("user_id >= %s", (bounds[-1],)))
+    return partitions
+
+
+def _scan_partition(index, where, params, func, batch_size, queue):
+    """Worker: stream one partition and put processed batches on the queue"""
+    connection = None
+    cursor = None
+    try:
+        connection = seed.connect_to_prodev()
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        cursor.execute(f"{query.select()} WHERE {where}", params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if func is not None:
+                rows = [func(row) for row in rows]
+            queue.put((_ROWS, rows))
+    except Exception as err:
+        queue.put((_ERROR, f"{where} {params}: {err!r}"))
+    finally:
+        if connection is not None:
+            seed.close_stream(cursor, connection)
+        queue.put((_DONE, index))
+
+
+def parallel_scan(func=None, partitions=None, workers=None, batch_size=1000, depth=16):
+    """
+    Generator that scans user_data partitions concurrently in worker processes
+    Each partition is streamed by its own process, which applies func to
+    every row so CPU-heavy work runs on all cores. Results are merged into
+    one iterator in arrival order; the bounded queue stops workers from
+    running far ahead of a slow consumer.
+    Args:
+        func: Optional picklable (module-level) function applied to each row
+        partitions: (where, params) pairs, defaults to range_partitions(workers)
+        workers: Number of partitions when partitions is not given
+        batch_size: Rows sent from a worker per queue message
+        depth: Maximum number of batches waiting in the queue
+    Yields:
+        func(row) for every row, or the row dictionaries when func is None
+    """
+    if partitions is None:
+        # Primary key ranges: each worker reads only its own slice of the table
+        partitions = range_partitions(workers or os.cpu_count() or 1)
+
+    partitions = list(partitions)
+    queue = multiprocessing.Queue(maxsize=depth)
+    processes = [
+        multiprocessing.Process(
+            target=_scan_partition,
+            args=(index, where, params, func, batch_size, queue),
+            daemon=True,
+        )
+        for index, (where, params) in enumerate(partitions)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        done = set()
+        exited = set()
+        while len(done) < len(processes):
+            try:
+                kind, payload = queue.get(timeout=_POLL_SECONDS)
+            except Empty:
+                # A killed worker never posts _DONE; fail instead of waiting
+                for index, process in enumerate(processes):
+                    if index in done or process.exitcode is None:
+                        continue
+                    if process.exitcode == 0 and index not in exited:
+                        # A clean exit posts _DONE first; allow one more poll
+                        exited.add(index)
+                        continue
+                    where, params = partitions[index]
+                    raise RuntimeError(
+                        f"Worker for partition {where} {params} exited with "
+                        f"code {process.exitcode} before finishing"
+                    )
+                continue
+            if kind == _DONE:
+                done.add(payload)
+            elif kind == _ERROR:
+                raise RuntimeError(f"Partition scan failed: {payload}")
+            else:
+                yield from payload
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
@@ -0,0 +1,193 @@
+#!/usr/bin/python3
+"""Pooled MySQL connections shared by seed and the generator modules"""
+import os
+import threading
+import time
+import mysql.connector
+from mysql.connector import errors
+
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "",
+    "database": "ALX_prodev",
+}
+
+
+class PooledConnection:
+    """
+    Proxy around a pooled connection
+    Behaves like the underlying connection, except that close() (or leaving
+    a with block) hands the connection back to the pool instead of closing it.
+    """
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+
+    @property
+    def raw_connection(self):
+        """The underlying connection, e.g. to key per-connection caches"""
+        return self._connection
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise errors.OperationalError("Connection was returned to the pool")
+        return getattr(self._connection, name)
+
+    def close(self):
+        """Return the connection to the pool"""
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of MySQL connections
+    Keeps up to size idle connections, lets up to max_overflow extra ones be
+    opened under load, checks each connection on checkout, and drops
+    connections that have been idle for longer than recycle seconds.
+    """
+
+    def __init__(self, size=5, max_overflow=5, timeout=30, recycle=300, **config):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.config = config or dict(DB_CONFIG)
+        self._condition = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        """Start from an empty pool owned by the current process"""
+        self._pid = os.getpid()
+        self._idle = []
+        self._open = 0
+        self.metrics = {
+            "checkouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "exhausted": 0,
+        }
+
+    def get(self):
+        """
+        Check a connection out of the pool
+        Returns:
+            PooledConnection: Proxy that returns the connection on close()
+        Raises:
+            mysql.connector.errors.PoolError: No connection became free in time
+        """
+        start = time.perf_counter()
+        waited = False
+        with self._condition:
+            # Sockets inherited from a parent process must not be shared
+            if self._pid != os.getpid():
+                self._reset()
+            while True:
+                if self._idle:
+                    connection, returned_at = self._idle.pop()
+                    if time.monotonic() - returned_at > self.recycle:
+                        self._discard(connection)
+                        continue
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    connection = None
+                    break
+                if not waited:
+                    waited = True
+                    self.metrics["exhausted"] += 1
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    raise errors.PoolError(
+                        f"No connection available within {self.timeout}s"
+                    )
+            self.metrics["checkouts"] += 1
+            if waited:
+                wait = time.perf_counter() - start
+                self.metrics["waits"] += 1
+                self.metrics["wait_seconds"] += wait
+                self.metrics["max_wait_seconds"] = max(
+                    self.metrics["max_wait_seconds"], wait
+                )
+
+        # Health-check reused connections and open new ones outside the lock
+        if connection is not None and not connection.is_connected():
+            with self._condition:
+                self._discard(connection)
+                self._open += 1
+            connection = None
+        if connection is None:
+            try:
+                connection = mysql.connector.connect(**self.config)
+            except mysql.connector.Error:
+                with self._condition:
+                    self._open -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self.metrics["created"] += 1
+        return PooledConnection(self, connection)
+
+    def release(self, connection):
+        """Put a connection back, or close it if it is unusable or surplus"""
+        # A half-read result cannot be reused, and an open transaction must
+        # never leak to the next caller
+        reusable = not connection.unread_result
+        if reusable:
+            try:
+                connection.rollback()
+            except mysql.connector.Error:
+                reusable = False
+        with self._condition:
+            if self._pid != os.getpid():
+                return
+            if reusable and len(self._idle) < self.size:
+                self._idle.append((connection, time.monotonic()))
+            else:
+                self._discard(connection)
+            self._condition.notify()
+
+    def _discard(self, connection):
+        """Close a connection and forget it; callers hold the lock"""
+        self._open -= 1
+        self.metrics["discarded"] += 1
+        try:
+            connection.close()
+        except mysql.connector.Error:
+            pass
+
+    def stats(self):
+        """Return a snapshot of the pool metrics and current occupancy"""
+        with self._condition:
+            return dict(self.metrics, open=self._open, idle=len(self._idle))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+
+def connect():
+    """Check a connection to ALX_prodev out of the shared pool"""
+    return get_pool().get()
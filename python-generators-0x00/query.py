@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+"""Parameterised, column-projected statements for user_data"""
+import functools
+
+COLUMNS = ("user_id", "name", "email", "age")
+OPERATORS = ("=", "!=", "<", "<=", ">", ">=")
+
+
+def where_clause(conditions):
+    """
+    Build a WHERE condition from (column, operator) pairs
+    Args:
+        conditions: Iterable of (column, operator); values are bound as %s
+    Returns:
+        str: The condition joined with AND, or None when there is none
+    """
+    parts = []
+    for column, op in conditions:
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown column: {column}")
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported operator: {op}")
+        parts.append(f"`{column}` {op} %s")
+    return " AND ".join(parts) or None
+
+
+@functools.lru_cache(maxsize=128)
+def select(columns=COLUMNS, where=(), order_by=None, limit=False, offset=False):
+    """
+    Build a parameterised SELECT on user_data
+    Identical arguments return the identical string, which is what lets
+    prepared cursors recognise and reuse a statement.
+    Args:
+        columns: Tuple of columns to project
+        where: Tuple of (column, operator) pairs, values bound as %s
+        order_by: Optional column to sort on
+        limit: Whether to add a bound LIMIT %s
+        offset: Whether to add a bound OFFSET %s after the limit
+    Returns:
+        str: The SQL statement
+    """
+    for column in columns + ((order_by,) if order_by else ()):
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown column: {column}")
+    sql = f"SELECT {', '.join(f'`{column}`' for column in columns)} FROM user_data"
+    condition = where_clause(where)
+    if condition:
+        sql += f" WHERE {condition}"
+    if order_by:
+        sql += f" ORDER BY `{order_by}`"
+    if limit:
+        sql += " LIMIT %s"
+        if offset:
+            sql += " OFFSET %s"
+    return sql
+
+
+def prepared_cursor(connection, sql):
+    """
+    Return a prepared cursor for sql, cached on the physical connection
+    The server parses and plans the statement once per connection; later
+    calls only send the parameters. Pooled connections keep their cache
+    between checkouts. Read every row before executing the cursor again.
+    Args:
+        connection: MySQL connection or pool.PooledConnection
+        sql: Statement from select()
+    Returns:
+        A prepared cursor to execute(sql, params) on
+    """
+    raw = getattr(connection, "raw_connection", connection)
+    cache = getattr(raw, "_prepared_cursors", None)
+    if cache is None:
+        cache = raw._prepared_cursors = {}
+    cursor = cache.get(sql)
+    if cursor is None:
+        cursor = cache[sql] = raw.cursor(prepared=True)
+    return cursor
+
+
+def fetch_dicts(cursor):
+    """Fetch all remaining rows of a cursor as dictionaries"""
+    columns = cursor.column_names
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+"""Schema and index advisor for the ALX_prodev user_data table"""
+import mysql.connector
+import seed
+
+# Smallest unsigned integer types able to hold a non-negative age
+AGE_TYPES = (("TINYINT UNSIGNED", 255), ("SMALLINT UNSIGNED", 65535))
+
+
+def list_indexes(connection):
+    """
+    Return the indexes of user_data
+    Returns:
+        dict: Index name mapped to (tuple of columns, is_unique)
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT INDEX_NAME, COLUMN_NAME, NON_UNIQUE "
+            "FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_data' "
+            "ORDER BY INDEX_NAME, SEQ_IN_INDEX"
+        )
+        indexes = {}
+        for name, column, non_unique in cursor.fetchall():
+            columns, _ = indexes.get(name, ((), not non_unique))
+            indexes[name] = (columns + (column,), not non_unique)
+        return indexes
+    finally:
+        cursor.close()
+
+
+def advise(connection):
+    """
+    Inspect user_data and suggest schema changes for the generator queries
+    Args:
+        connection: MySQL database connection
+    Returns:
+        list: (reason, ALTER TABLE clause) pairs, empty when nothing is left to do
+    """
+    indexes = list_indexes(connection)
+    by_columns = {columns: name for name, (columns, _) in indexes.items()}
+    advice = []
+
+    for name, (columns, _) in indexes.items():
+        if name != "PRIMARY" and columns == ("user_id",):
+            advice.append(
+                (f"{name} duplicates the primary key", f"DROP INDEX `{name}`")
+            )
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT DATA_TYPE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_data' "
+            "AND COLUMN_NAME = 'age'"
+        )
+        (age_type,) = cursor.fetchone()
+        if age_type == "decimal":
+            cursor.execute("SELECT MIN(age), MAX(age) FROM user_data")
+            low, high = cursor.fetchone()
+            if low is None or low >= 0:
+                for sql_type, limit in AGE_TYPES:
+                    if high is None or high <= limit:
+                        advice.append(
+                            (
+                                f"age DECIMAL(10,0) fits in {sql_type}",
+                                f"MODIFY `age` {sql_type} NOT NULL",
+                            )
+                        )
+                        break
+
+        if ("age",) not in by_columns:
+            advice.append(
+                (
+                    "stream_user_ages, batch_processing and aggregates read or "
+                    "filter on age",
+                    "ADD INDEX `idx_age` (`age`)",
+                )
+            )
+
+        if ("email",) not in by_columns:
+            cursor.execute("SELECT COUNT(*) - COUNT(DISTINCT email) FROM user_data")
+            (duplicates,) = cursor.fetchone()
+            if duplicates:
+                advice.append(
+                    (
+                        f"email lookups; {duplicates} duplicate emails prevent "
+                        "a unique index",
+                        "ADD INDEX `idx_email` (`email`)",
+                    )
+                )
+            else:
+                advice.append(
+                    ("email lookups", "ADD UNIQUE INDEX `idx_email` (`email`)")
+                )
+    finally:
+        cursor.close()
+    return advice
+
+
+def migrate(connection, dry_run=False):
+    """
+    Apply the advised changes in a single ALTER TABLE
+    Combining the clauses rebuilds the table once instead of once per change.
+    Args:
+        connection: MySQL database connection
+        dry_run: Only print the statement that would run
+    Returns:
+        bool: True if the table is (or would be) changed, False otherwise
+    """
+    advice = advise(connection)
+    if not advice:
+        print("user_data schema is already tuned")
+        return False
+    for reason, clause in advice:
+        print(f"{clause}: {reason}")
+
+    statement = "ALTER TABLE user_data " + ", ".join(clause for _, clause in advice)
+    if dry_run:
+        print(statement)
+        return True
+    cursor = connection.cursor()
+    try:
+        cursor.execute(statement)
+    except mysql.connector.Error as err:
+        print(f"Failed migrating user_data: {err}")
+        return False
+    finally:
+        cursor.close()
+    print("user_data migrated successfully")
+    return True
+
+
+if __name__ == "__main__":
+    connection = seed.connect_to_prodev()
+    if connection:
+        migrate(connection)
+        connection.close()
@@ -1,13 +1,70 @@
 import csv
+import hashlib
+import json
+import os
+import sqlite3
+import time
 import uuid
 import mysql.connector
 from mysql.connector import errorcode
+import pool
+import query
+
+ROW_TYPES = ("dict", "tuple", "record")
+
+
+class UserRecord:
+    """Compact user row with fixed attributes and no per-row dict"""
+
+    __slots__ = ("user_id", "name", "email", "age")
+
+    def __init__(self, user_id, name, email, age):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.age = age
+
+    def __getitem__(self, key):
+        # Lets code written against dict rows keep using row["age"]
+        return getattr(self, key)
+
+    def __repr__(self):
+        return (
+            f"UserRecord(user_id={self.user_id!r}, name={self.name!r}, "
+            f"email={self.email!r}, age={self.age!r})"
+        )
+
+
+def open_cursor(connection, row_type="dict", **kwargs):
+    """
+    Open a cursor whose rows suit the requested row type
+    Args:
+        connection: MySQL database connection
+        row_type: "dict", "tuple" or "record" (UserRecord)
+        kwargs: Extra cursor options such as buffered
+    Returns:
+        A cursor; pass its rows through as_row_type
+    """
+    if row_type not in ROW_TYPES:
+        raise ValueError(f"Unknown row type: {row_type}")
+    return connection.cursor(dictionary=row_type == "dict", **kwargs)
+
+
+def as_row_type(rows, row_type):
+    """Convert rows of query.select() columns fetched by open_cursor"""
+    if row_type == "record":
+        return [UserRecord(*row) for row in rows]
+    return rows
 
 
 def connect_db():
     """Connect to the MySQL server"""
     try:
-        connection = mysql.connector.connect(host="localhost", user="root", password="")
+        # The server-level connection is used once for setup, so it is not pooled
+        server_config = {
+            key: value for key, value in pool.DB_CONFIG.items() if key != "database"
+        }
+        connection = mysql.connector.connect(**server_config)
         return connection
     except mysql.connector.Error as err:
         print(f"Error connecting to MySQL: {err}")
@@ -28,17 +85,29 @@ def create_database(connection):
 
 
 def connect_to_prodev():
-    """Connect to the ALX_prodev database"""
+    """Connect to the ALX_prodev database through the shared connection pool"""
     try:
-        connection = mysql.connector.connect(
-            host="localhost", user="root", password="", database="ALX_prodev"
-        )
+        connection = pool.connect()
         return connection
     except mysql.connector.Error as err:
         print(f"Error connecting to ALX_prodev: {err}")
         return None
 
 
+def close_stream(cursor, connection):
+    """
+    Close a streaming cursor and its connection
+    An unbuffered cursor abandoned before its last row cannot be closed
+    without draining the result, so the connection is dropped instead.
+    """
+    if cursor is not None:
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass  # Unread rows are discarded with the connection
+    connection.close()
+
+
 def create_table(connection):
     """Create the user_data table if it doesn't exist"""
     cursor = connection.cursor()
@@ -94,23 +163,306 @@ def insert_data(connection, csv_file):
     return True
 
 
-def stream_rows(connection, batch_size=1):
+def _read_checkpoint(checkpoint_file, csv_file):
+    """Return the number of CSV rows already loaded according to the checkpoint"""
+    if not checkpoint_file or not os.path.exists(checkpoint_file):
+        return 0
+    with open(checkpoint_file) as file:
+        state = json.load(file)
+    # A checkpoint written for another file must not skip any rows
+    if state.get("csv_file") != os.path.abspath(csv_file):
+        return 0
+    return state.get("rows", 0)
+
+
+def _write_checkpoint(checkpoint_file, csv_file, rows):
+    """Atomically record how many CSV rows have been committed"""
+    tmp_file = f"{checkpoint_file}.tmp"
+    with open(tmp_file, mode="w") as file:
+        json.dump({"csv_file": os.path.abspath(csv_file), "rows": rows}, file)
+    os.replace(tmp_file, checkpoint_file)
+
+
+def _csv_chunks(csv_file, chunk_size, skip=0):
+    """
+    Generator that reads the CSV file in chunks of value tuples
+    Args:
+        csv_file: Path to the CSV file
+        chunk_size: Number of rows per chunk
+        skip: Number of leading data rows to skip (already loaded)
+    Yields:
+        list: Tuples of (user_id, name, email, age)
+    """
+    with open(csv_file, mode="r", newline="") as file:
+        csv_reader = csv.DictReader(file)
+        chunk = []
+        for index, row in enumerate(csv_reader):
+            if index < skip:
+                continue
+            chunk.append((row["user_id"], row["name"], row["email"], int(row["age"])))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _load_data_infile(connection, csv_file):
+    """Load the whole CSV file with LOAD DATA LOCAL INFILE, skipping existing ids"""
+    with open(csv_file, mode="r", newline="") as file:
+        header = next(csv.reader(file))
+    # Map CSV columns onto the table, discarding any column we do not store
+    columns = ", ".join(
+        f"`{name}`" if name in ("user_id", "name", "email", "age") else "@skip"
+        for name in header
+    )
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE user_data "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+            "LINES TERMINATED BY '\\n' IGNORE 1 LINES "
+            f"({columns})",
+            (os.path.abspath(csv_file),),
+        )
+        connection.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def bulk_insert_data(
+    connection, csv_file, chunk_size=5000, checkpoint_file=None, use_load_data=False
+):
+    """
+    Bulk load a CSV file into user_data using batched multi-row upserts
+    Rows whose user_id already exists are left untouched, like insert_data.
+    Each chunk is committed on its own and, when checkpoint_file is given,
+    recorded there so an interrupted load resumes after the last chunk.
+    Args:
+        connection: MySQL database connection (e.g. from connect_to_prodev)
+        csv_file: Path to the CSV file
+        chunk_size: Number of rows written per INSERT statement
+        checkpoint_file: Optional path used to resume an interrupted load
+        use_load_data: Try LOAD DATA LOCAL INFILE first (needs local_infile)
+    Returns:
+        bool: True on success, False otherwise
+    """
+    start = time.perf_counter()
+
+    if use_load_data:
+        try:
+            loaded = _load_data_infile(connection, csv_file)
+            elapsed = time.perf_counter() - start
+            print(f"Loaded {loaded} rows from {csv_file} in {elapsed:.2f}s")
+            return True
+        except mysql.connector.Error as err:
+            connection.rollback()
+            print(f"LOAD DATA unavailable ({err}), falling back to batched inserts")
+
+    done = _read_checkpoint(checkpoint_file, csv_file)
+    if done:
+        print(f"Resuming {csv_file} after {done} rows")
+
+    cursor = connection.cursor()
+    loaded = 0
+    try:
+        for chunk in _csv_chunks(csv_file, chunk_size, skip=done):
+            placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+            # The no-op update keeps existing rows as they are
+            cursor.execute(
+                "INSERT INTO user_data (user_id, name, email, age) "
+                f"VALUES {placeholders} "
+                "ON DUPLICATE KEY UPDATE user_id = user_id",
+                [value for row in chunk for value in row],
+            )
+            connection.commit()
+
+            done += len(chunk)
+            loaded += len(chunk)
+            if checkpoint_file:
+                _write_checkpoint(checkpoint_file, csv_file, done)
+
+            elapsed = time.perf_counter() - start
+            print(f"{done} rows processed ({loaded / elapsed:.0f} rows/s)")
+
+        if checkpoint_file and os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
+        print(f"Data bulk inserted successfully from {csv_file}")
+    except Exception as err:
+        connection.rollback()
+        print(f"Error bulk inserting data: {err}")
+        return False
+    finally:
+        cursor.close()
+    return True
+
+
+# Local bookkeeping of what sync_data last loaded, kept in a SQLite file
+SYNC_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS chunks (idx INTEGER PRIMARY KEY, digest TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS rows (
+    user_id TEXT PRIMARY KEY, chunk INTEGER NOT NULL, digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rows_chunk ON rows (chunk);
+CREATE TEMP TABLE IF NOT EXISTS incoming (user_id TEXT PRIMARY KEY, digest TEXT);
+CREATE TEMP TABLE IF NOT EXISTS seen (user_id TEXT PRIMARY KEY);
+CREATE TEMP TABLE IF NOT EXISTS changed (idx INTEGER PRIMARY KEY);
+"""
+
+
+def _row_digest(row):
+    """Return a content hash of one CSV row"""
+    return hashlib.sha1("\x1f".join(map(str, row)).encode()).hexdigest()
+
+
+def sync_data(connection, csv_file, state_file=None, chunk_size=10_000):
+    """
+    Incrementally sync user_data with a CSV file
+    The file size and mtime, a hash per chunk of rows and a hash per row of
+    the last successful sync are kept in a local SQLite state file. An
+    untouched file is skipped outright, unchanged chunks are only hashed,
+    and only new or changed rows are written. Rows that disappeared from a
+    changed chunk are deleted. Everything is committed together at the end.
+    Args:
+        connection: MySQL database connection
+        csv_file: Path to the CSV file
+        state_file: Path of the state file (default: csv_file + ".sync")
+        chunk_size: Number of CSV rows per hashed chunk
+    Returns:
+        bool: True on success, False otherwise
+    """
+    state_file = state_file or f"{csv_file}.sync"
+    stat = os.stat(csv_file)
+    signature = f"{stat.st_size}:{stat.st_mtime_ns}:{chunk_size}"
+    start = time.perf_counter()
+
+    state = sqlite3.connect(state_file)
+    cursor = connection.cursor()
+    try:
+        state.executescript(SYNC_STATE_SCHEMA)
+        meta = dict(state.execute("SELECT key, value FROM meta"))
+        if meta.get("signature") == signature:
+            print(f"{csv_file} is unchanged since the last sync")
+            return True
+        if meta.get("chunk_size") != str(chunk_size):
+            # Chunk boundaries moved, so every stored chunk counts as changed
+            state.execute("INSERT INTO changed SELECT DISTINCT chunk FROM rows")
+            state.execute("DELETE FROM chunks")
+        known = dict(state.execute("SELECT idx, digest FROM chunks"))
+
+        chunk_count = 0
+        upserted = 0
+        for index, chunk in enumerate(_csv_chunks(csv_file, chunk_size)):
+            chunk_count = index + 1
+            digests = [_row_digest(row) for row in chunk]
+            chunk_digest = hashlib.sha1("".join(digests).encode()).hexdigest()
+            if known.get(index) == chunk_digest:
+                continue
+
+            state.execute("INSERT OR IGNORE INTO changed VALUES (?)", (index,))
+            state.execute("DELETE FROM incoming")
+            state.executemany(
+                "INSERT OR REPLACE INTO incoming VALUES (?, ?)",
+                ((row[0], digest) for row, digest in zip(chunk, digests)),
+            )
+            changed_ids = {
+                user_id
+                for (user_id,) in state.execute(
+                    "SELECT i.user_id FROM incoming i "
+                    "LEFT JOIN rows r ON r.user_id = i.user_id "
+                    "WHERE r.digest IS NULL OR r.digest != i.digest"
+                )
+            }
+            changed = [row for row in chunk if row[0] in changed_ids]
+            if changed:
+                placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(changed))
+                cursor.execute(
+                    "INSERT INTO user_data (user_id, name, email, age) "
+                    f"VALUES {placeholders} "
+                    "ON DUPLICATE KEY UPDATE name = VALUES(name), "
+                    "email = VALUES(email), age = VALUES(age)",
+                    [value for row in changed for value in row],
+                )
+                upserted += len(changed)
+
+            state.execute("INSERT OR IGNORE INTO seen SELECT user_id FROM incoming")
+            state.execute(
+                "INSERT OR REPLACE INTO rows SELECT user_id, ?, digest FROM incoming",
+                (index,),
+            )
+            state.execute(
+                "INSERT OR REPLACE INTO chunks VALUES (?, ?)", (index, chunk_digest)
+            )
+
+        # Chunks past the new end of the file have changed to nothing
+        state.execute(
+            "INSERT OR IGNORE INTO changed SELECT idx FROM chunks WHERE idx >= ?",
+            (chunk_count,),
+        )
+        state.execute("DELETE FROM chunks WHERE idx >= ?", (chunk_count,))
+
+        # A row last seen in a changed chunk and found nowhere now was deleted
+        deleted = [
+            user_id
+            for (user_id,) in state.execute(
+                "SELECT user_id FROM rows WHERE chunk IN (SELECT idx FROM changed) "
+                "AND user_id NOT IN (SELECT user_id FROM seen)"
+            )
+        ]
+        for offset in range(0, len(deleted), chunk_size):
+            batch = deleted[offset : offset + chunk_size]
+            cursor.execute(
+                "DELETE FROM user_data WHERE user_id IN "
+                f"({', '.join(['%s'] * len(batch))})",
+                batch,
+            )
+        state.execute(
+            "DELETE FROM rows WHERE chunk IN (SELECT idx FROM changed) "
+            "AND user_id NOT IN (SELECT user_id FROM seen)"
+        )
+
+        connection.commit()
+        state.executemany(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+            (("signature", signature), ("chunk_size", str(chunk_size))),
+        )
+        state.commit()
+        elapsed = time.perf_counter() - start
+        print(
+            f"Synced {csv_file}: {upserted} rows upserted, "
+            f"{len(deleted)} rows deleted in {elapsed:.2f}s"
+        )
+    except Exception as err:
+        connection.rollback()
+        state.rollback()
+        print(f"Error syncing data: {err}")
+        return False
+    finally:
+        cursor.close()
+        state.close()
+    return True
+
+
+def stream_rows(connection, batch_size=1, row_type="dict"):
     """
     Generator that streams rows from the user_data table one by one
     Args:
         connection: MySQL database connection
         batch_size: Number of rows to fetch at a time (default 1)
+        row_type: "dict", "tuple" or "record" (UserRecord)
     Yields:
-        dict: A dictionary representing a single row
+        A single row in the requested representation
     """
-    cursor = connection.cursor(dictionary=True)
+    cursor = open_cursor(connection, row_type)
     try:
-        cursor.execute("SELECT * FROM user_data")
+        cursor.execute(query.select())
         while True:
             rows = cursor.fetchmany(batch_size)
             if not rows:
                 break
-            for row in rows:
+            for row in as_row_type(rows, row_type):
                 yield row
     finally:
         cursor.close()
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+"""Deterministic synthetic user_data for benchmarking at scale"""
+import csv
+import random
+import sys
+import uuid
+import seed
+
+MAX_ROWS = 50_000_000
+
+
+def generate_users(
+    count,
+    seed_value=0,
+    age_distribution="uniform",
+    min_age=18,
+    max_age=90,
+    email_cardinality=None,
+):
+    """
+    Generator of reproducible user rows shaped like user_data
+    The same arguments always produce the same rows.
+    Args:
+        count: Number of rows, at most MAX_ROWS
+        seed_value: Random seed
+        age_distribution: "uniform" or "normal" (centred between the bounds)
+        min_age: Smallest age
+        max_age: Largest age
+        email_cardinality: Number of distinct emails, or None for all unique
+    Yields:
+        tuple: (user_id, name, email, age)
+    """
+    if not 0 <= count <= MAX_ROWS:
+        raise ValueError(f"count must be between 0 and {MAX_ROWS}")
+    if age_distribution not in ("uniform", "normal"):
+        raise ValueError(f"Unknown age distribution: {age_distribution}")
+
+    rng = random.Random(seed_value)
+    mean = (min_age + max_age) / 2
+    spread = (max_age - min_age) / 6
+    for index in range(count):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        if age_distribution == "uniform":
+            age = rng.randint(min_age, max_age)
+        else:
+            age = min(max(round(rng.gauss(mean, spread)), min_age), max_age)
+        if email_cardinality:
+            email = f"user{rng.randrange(email_cardinality)}@example.com"
+        else:
+            email = f"user{index}@example.com"
+        yield user_id, f"User {index}", email, age
+
+
+def write_csv(csv_file, count, **options):
+    """
+    Write synthetic users to a CSV file readable by seed's loaders
+    Args:
+        csv_file: Destination path
+        count: Number of rows
+        options: Passed on to generate_users
+    """
+    with open(csv_file, mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(("user_id", "name", "email", "age"))
+        writer.writerows(generate_users(count, **options))
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    csv_file = sys.argv[2] if len(sys.argv) > 2 else "synthetic_user_data.csv"
+    write_csv(csv_file, rows)
+    print(f"Wrote {rows} synthetic users to {csv_file}")
+
+    server = seed.connect_db()
+    if server:
+        seed.create_database(server)
+        server.close()
+        connection = seed.connect_to_prodev()
+        if connection:
+            seed.create_table(connection)
+            seed.bulk_insert_data(
+                connection, csv_file, checkpoint_file=f"{csv_file}.ckpt"
+            )
+            connection.close()